@@ -78,8 +78,8 @@ def dev_viewport():
     window.orchestrator.subscribe(Event.KEYS_PRESSED, guy, guy.handle_keypressed)
 
     front_layer = Layer()
-    medback_layer = Layer(motion_scale=(1.5, 1))
-    back_layer = Layer(motion_scale=(0.25, 1))
+    medback_layer = Layer(motion_scale=(1.5, 1), static=True)
+    back_layer = Layer(motion_scale=(0.25, 1), static=True)
 
     viewport.add_layer(0, front_layer)
     viewport.add_layer(10, medback_layer)
@@ -3,3 +3,4 @@ import pygame
 from events.constants import Event
 from events.orchestrator import Orchestrator
 from events.chronoorchestrator import ChronoOrchestrator
+from events.animationscheduler import AnimationScheduler
@@ -0,0 +1,103 @@
+"""
+AnimationScheduler advances every running animation from the logic loop
+
+Rather than each animation waiting on its own clock in its own thread, animations register with the scheduler and
+are handed the elapsed time (in milliseconds) whenever it is updated. Animations only need an advance(ms) method.
+
+When using the scheduler, use AnimationScheduler.get_instance() to retrieve the current scheduler.
+"""
+import logging
+import time
+
+from threading import Lock
+
+from typing import Any, Dict
+
+
+class AnimationScheduler:
+    """
+    Drives registered animations from elapsed time
+    """
+
+    SINGLETON = None
+
+    @staticmethod
+    def get_instance(fresh: bool = False) -> "AnimationScheduler":
+        """
+        Returns a singleton of the animation scheduler
+        """
+        if not AnimationScheduler.SINGLETON or fresh:
+            AnimationScheduler.SINGLETON = AnimationScheduler()
+
+        return AnimationScheduler.SINGLETON
+
+    def __init__(self) -> None:
+        """
+        Registry maps id(animation) to the animation, in registration order
+        """
+        self.logger = logging.getLogger(__name__)
+        self.registry: Dict[int, Any] = {}
+        self.lock: Lock = Lock()
+
+        self.time_scale: float = 1.0
+        self.paused: bool = False
+        self.last_update: float = None
+
+    def register(self, animation: Any) -> None:
+        """
+        Registers an animation to be advanced on every update
+        """
+        with self.lock:
+            self.registry[id(animation)] = animation
+
+    def unregister(self, animation: Any) -> None:
+        """
+        Stops advancing an animation
+        """
+        with self.lock:
+            self.registry.pop(id(animation), None)
+
+    def is_registered(self, animation: Any) -> bool:
+        """
+        Returns whether an animation is being advanced
+        """
+        return id(animation) in self.registry
+
+    def pause(self) -> None:
+        """
+        Pauses every animation; time spent paused is not applied on resume
+        """
+        self.paused = True
+
+    def resume(self) -> None:
+        """
+        Resumes every animation
+        """
+        self.paused = False
+
+    def update(self, now: float = None) -> None:
+        """
+        Advances every registered animation by the (scaled) time since the last update
+
+        :param now: The current time in seconds, defaults to time.monotonic()
+        """
+        if now is None:
+            now = time.monotonic()
+
+        last_update = self.last_update
+        self.last_update = now
+        if last_update is None or self.paused:
+            return
+
+        elapsed = (now - last_update) * 1000 * self.time_scale
+        if elapsed <= 0:
+            return
+
+        with self.lock:
+            animations = list(self.registry.values())
+
+        for animation in animations:
+            try:
+                animation.advance(elapsed)
+            except Exception as e:  # pragma: no cover
+                self.logger.error(f"Error while advancing animation:\n\t{animation}\n\t{e}")
@@ -0,0 +1,58 @@
+from events import AnimationScheduler
+
+
+class AnimationTester:
+    def __init__(self):
+        self.elapsed = 0
+
+    def advance(self, milliseconds):
+        self.elapsed = self.elapsed + milliseconds
+
+
+def test_animationscheduler_singleton():
+    """
+    Scheduler get instance should return the same object, unless fresh is supplied
+    """
+    scheduler = AnimationScheduler.get_instance()
+    new_scheduler = AnimationScheduler.get_instance()
+
+    assert id(scheduler) == id(new_scheduler)
+
+    new_scheduler = AnimationScheduler.get_instance(fresh=True)
+
+    assert id(scheduler) != id(new_scheduler)
+
+
+def test_animationscheduler_updates():
+    scheduler = AnimationScheduler.get_instance(fresh=True)
+    tester = AnimationTester()
+    scheduler.register(tester)
+
+    # The first update only establishes the starting time
+    scheduler.update(10)
+    assert tester.elapsed == 0
+
+    scheduler.update(10.25)
+    assert tester.elapsed == 250
+
+    scheduler.pause()
+    scheduler.update(11)
+    scheduler.resume()
+    scheduler.update(11.5)
+    assert tester.elapsed == 750
+
+    scheduler.time_scale = 0.5
+    scheduler.update(12.5)
+    assert tester.elapsed == 1250
+
+    scheduler.unregister(tester)
+    scheduler.update(20)
+    assert tester.elapsed == 1250
+    assert not scheduler.is_registered(tester)
+
+
+def test_animationscheduler_monotonic():
+    scheduler = AnimationScheduler.get_instance(fresh=True)
+    scheduler.update()
+
+    assert scheduler.last_update is not None
@@ -1,20 +1,12 @@
-from typing import List
+from imaging.constants import KEY_HUES, KEY_HUES_LIST
 from imaging.palette import Palette
-from imaging.spritesheet import Spritesheet
+from imaging.paintcache import PaintCache, DiskPaintCache
+from imaging.indexed import IndexedSurface
+from imaging.dedup import FrameDeduplicator
+from imaging.optimize import SurfaceOptimizer
+from imaging.transformcache import TransformCache
+from imaging.framestore import CompressedFrame, FramePool
+from imaging.spritesheet import Spritesheet, SlicedSheet
+from imaging.atlas import TextureAtlas, AtlasFrame
 from imaging.sprites import Sprite, AnimatedSprite
-
-from enum import Enum
-
-
-class KEY_HUES(Enum):
-    """
-    Key hues represent the hue value that imaging logic uses to process images
-    """
-
-    PRIMARY = 240
-    SECONDARY = 200
-    TERTIARY = 160
-    QUATERNARY = 100
-
-
-KEY_HUES_LIST: List[int] = [v.value for v in KEY_HUES]
+from imaging.pipeline import AssetPipeline, LoadedAsset
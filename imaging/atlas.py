@@ -0,0 +1,145 @@
+"""
+Texture atlas
+
+Packs many small surfaces (sliced frames, standalone sprite images) into a few large atlas pages. Each packed
+surface is represented by an AtlasFrame: the page it lives on plus its rect, along with a subsurface view of
+that rect which can be blitted like any other surface. Sprite and AnimatedSprite accept frames in place of
+surfaces.
+
+Pages are packed with the skyline bottom-left heuristic.
+"""
+import pygame
+
+from typing import List, Tuple, Union
+
+
+class AtlasFrame:
+    """
+    AtlasFrame is a handle to a surface packed into an atlas page
+    """
+
+    __slots__ = ["page", "rect", "surface"]
+
+    def __init__(self, page: pygame.Surface, rect: pygame.Rect):
+        """
+        :param page: The atlas page surface
+        :param rect: Where the frame lives on the page
+        """
+        self.page: pygame.Surface = page
+        self.rect: pygame.Rect = rect
+        self.surface: pygame.Surface = page.subsurface(rect)  # A view of the page, no pixels are copied
+
+    @staticmethod
+    def resolve(image: Union[pygame.Surface, "AtlasFrame"]) -> pygame.Surface:
+        """
+        Returns the surface for either a surface or an atlas frame
+        """
+        if isinstance(image, AtlasFrame):
+            return image.surface
+        return image
+
+
+class TextureAtlas:
+    """
+    TextureAtlas bin-packs surfaces into fixed size pages, creating pages as they fill up
+    """
+
+    def __init__(self, page_size: Tuple[int, int] = (2048, 2048), padding: int = 1):
+        """
+        Creates an empty atlas
+
+        :param page_size: The (width, height) of each atlas page
+        :param padding: Transparent pixels kept between packed surfaces, preventing bleed when scaling
+        """
+        self.page_size: Tuple[int, int] = page_size
+        self.padding: int = padding
+        self.pages: List[pygame.Surface] = []
+        # Skyline of each page; segments of [x, y, width] ordered left to right
+        self.skylines: List[List[List[int]]] = []
+
+    def add(self, surface: pygame.Surface) -> AtlasFrame:
+        """
+        Packs a single surface into the atlas, returning its frame
+        """
+        (width, height) = surface.get_size()
+        (padded_width, padded_height) = (width + self.padding, height + self.padding)
+        if padded_width > self.page_size[0] or padded_height > self.page_size[1]:
+            raise ValueError(f"Surface of size {surface.get_size()} does not fit atlas pages of {self.page_size}")
+
+        for (page, skyline) in zip(self.pages, self.skylines):
+            position = self.find_position(skyline, padded_width, padded_height)
+            if position is not None:
+                return self.place(page, skyline, position, surface)
+
+        self.pages.append(pygame.Surface(self.page_size, pygame.SRCALPHA))
+        self.skylines.append([[0, 0, self.page_size[0]]])
+        position = self.find_position(self.skylines[-1], padded_width, padded_height)
+        return self.place(self.pages[-1], self.skylines[-1], position, surface)
+
+    def pack(self, surfaces: List[pygame.Surface]) -> List[AtlasFrame]:
+        """
+        Packs many surfaces, tallest first for a tighter fit, returning their frames in the original order
+        """
+        order = sorted(range(0, len(surfaces)), key=lambda i: (-surfaces[i].get_height(), -surfaces[i].get_width()))
+        frames: List[AtlasFrame] = [None] * len(surfaces)
+        for index in order:
+            frames[index] = self.add(surfaces[index])
+        return frames
+
+    def pack_sheet(self, sheet: List[List[pygame.Surface]]) -> List[List[AtlasFrame]]:
+        """
+        Packs a fully sliced spritesheet (rows of frames), returning frames in the same layout
+        """
+        frames = iter(self.pack([frame for row in sheet for frame in row]))
+        return [[next(frames) for _ in row] for row in sheet]
+
+    def find_position(self, skyline: List[List[int]], width: int, height: int) -> Tuple[int, int, int]:
+        """
+        Finds the lowest (then leftmost) spot on a skyline for a rect, returning (segment index, x, y) or None
+        """
+        best = None
+        for index in range(0, len(skyline)):
+            x = skyline[index][0]
+            if x + width > self.page_size[0]:
+                break
+
+            # The rect rests on the highest segment it spans
+            y = 0
+            remaining = width
+            span = index
+            while remaining > 0:
+                y = max(y, skyline[span][1])
+                remaining = remaining - skyline[span][2]
+                span = span + 1
+
+            if y + height <= self.page_size[1] and (best is None or (y + height, x) < (best[2] + height, best[1])):
+                best = (index, x, y)
+
+        return best
+
+    def place(
+        self, page: pygame.Surface, skyline: List[List[int]], position: Tuple[int, int, int], surface: pygame.Surface
+    ) -> AtlasFrame:
+        """
+        Copies a surface onto a page at a position found by find_position, raising the skyline beneath it
+        """
+        (index, x, y) = position
+        (width, height) = surface.get_size()
+        padded_width = width + self.padding
+
+        # The page starts fully transparent, so a max blend copies the surface's pixels and alpha exactly
+        page.blit(surface, (x, y), special_flags=pygame.BLEND_RGBA_MAX)
+
+        # Replace the spanned segments with the new top edge, keeping any partially covered remainder
+        end = x + padded_width
+        covered = index
+        while covered < len(skyline) and skyline[covered][0] + skyline[covered][2] <= end:
+            covered = covered + 1
+        remainder = []
+        if covered < len(skyline) and skyline[covered][0] < end:
+            segment = skyline[covered]
+            remainder = [[end, segment[1], segment[0] + segment[2] - end]]
+            covered = covered + 1
+        skyline[index:covered] = [[x, y + height + self.padding, padded_width]] + remainder
+
+        return AtlasFrame(page, pygame.Rect(x, y, width, height))
@@ -0,0 +1,61 @@
+"""
+Frame deduplication
+
+Animations reuse identical frames (idle holds, poses shared between directions) and different sheets often
+contain the same tiles. A FrameDeduplicator hashes each frame's pixels and hands back the first surface seen
+with those pixels, so every copy shares one surface.
+
+Shared surfaces should be treated as read only.
+"""
+import pygame
+
+from threading import Lock
+
+from imaging.surfaceutil import surface_bytes, surface_digest
+
+from typing import Dict, List
+
+
+class FrameDeduplicator:
+    """
+    FrameDeduplicator returns a single shared surface for every frame with identical size and RGBA contents
+    """
+
+    def __init__(self):
+        self.surfaces: Dict[str, pygame.Surface] = {}
+        self.duplicates: int = 0
+        self.bytes_saved: int = 0
+        self.lock: Lock = Lock()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the deduplication counters
+        """
+        return {"unique": len(self.surfaces), "duplicates": self.duplicates, "bytes_saved": self.bytes_saved}
+
+    def dedupe(self, surface: pygame.Surface) -> pygame.Surface:
+        """
+        Returns the shared surface with the same pixels as this surface, which becomes shared if it is the first
+        """
+        key = surface_digest(surface)
+
+        with self.lock:
+            shared = self.surfaces.setdefault(key, surface)
+            if shared is not surface:
+                self.duplicates = self.duplicates + 1
+                self.bytes_saved = self.bytes_saved + surface_bytes(surface)
+
+        return shared
+
+    def dedupe_frames(self, frames: List[pygame.Surface]) -> List[pygame.Surface]:
+        """
+        Deduplicates a list of frames, i.e. an animation
+        """
+        return [self.dedupe(frame) for frame in frames]
+
+    def dedupe_sheet(self, sheet: List[List[pygame.Surface]]) -> List[List[pygame.Surface]]:
+        """
+        Deduplicates a fully sliced spritesheet (rows of frames), keeping its layout
+        """
+        return [self.dedupe_frames(row) for row in sheet]
@@ -0,0 +1,112 @@
+"""
+Compressed frame storage
+
+Large casts keep hundreds of animations loaded while only a few are on screen. Frames of those animations can
+be held as zlib compressed RGBA (CompressedFrame) and decompressed on demand into a small, shared pool of warm
+surfaces (FramePool). The least recently used warm surfaces are dropped again when the pool exceeds its byte
+budget, leaving only the compressed copy resident.
+
+When using the pool, use FramePool.get_instance() to retrieve the shared pool. Warm surfaces are shared, so
+they should be treated as read only.
+"""
+import pygame
+import weakref
+import zlib
+
+from threading import Lock
+
+from imaging.optimize import SurfaceOptimizer
+from imaging.surfaceutil import SurfaceLRU
+
+from typing import Tuple
+
+
+class CompressedFrame:
+    """
+    CompressedFrame holds a frame's pixels as zlib compressed RGBA
+    """
+
+    __slots__ = ["size", "data", "optimize", "__weakref__"]
+
+    # Compression level; decompression speed barely depends on it, so favor fast compression at load time
+    LEVEL: int = 1
+
+    # Source surface -> compressed frame, so shared (i.e. deduplicated) frames share their compressed copy
+    compressed: "weakref.WeakKeyDictionary[pygame.Surface, CompressedFrame]" = weakref.WeakKeyDictionary()
+    lock: Lock = Lock()
+
+    def __init__(self, size: Tuple[int, int], data: bytes, optimize: bool = True):
+        """
+        :param size: The frame's (width, height)
+        :param data: The zlib compressed RGBA pixels
+        :param optimize: Convert the frame to the fastest matching display format when it is decompressed
+        """
+        self.size: Tuple[int, int] = size
+        self.data: bytes = data
+        self.optimize: bool = optimize
+
+    @staticmethod
+    def compress(surface: pygame.Surface, optimize: bool = True) -> "CompressedFrame":
+        """
+        Compresses a surface, reusing the compressed frame if this surface was compressed before
+        """
+        with CompressedFrame.lock:
+            frame = CompressedFrame.compressed.get(surface)
+        if frame is not None and frame.optimize == optimize:
+            return frame
+
+        data = zlib.compress(pygame.image.tostring(surface, "RGBA"), CompressedFrame.LEVEL)
+        frame = CompressedFrame(surface.get_size(), data, optimize)
+
+        with CompressedFrame.lock:
+            CompressedFrame.compressed[surface] = frame
+        return frame
+
+    def decompress(self) -> pygame.Surface:
+        """
+        Returns a new surface holding the frame's pixels
+        """
+        surface = pygame.image.fromstring(zlib.decompress(self.data), self.size, "RGBA")
+        if self.optimize:
+            surface = SurfaceOptimizer.optimize(surface)
+        return surface
+
+
+class FramePool(SurfaceLRU):
+    """
+    Least recently used pool of decompressed frames, bounded by the number of bytes of pixel data held
+    """
+
+    SINGLETON = None
+
+    DEFAULT_MAX_BYTES: int = 16 * 1024 * 1024
+
+    @staticmethod
+    def get_instance(fresh: bool = False) -> "FramePool":
+        """
+        Returns a singleton of the frame pool
+        """
+        if not FramePool.SINGLETON or fresh:
+            FramePool.SINGLETON = FramePool()
+
+        return FramePool.SINGLETON
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Creates a frame pool
+
+        :param max_bytes: The number of bytes of warm surface data the pool may hold before demoting frames
+        """
+        super().__init__(max_bytes)
+
+    def surface(self, frame: CompressedFrame) -> pygame.Surface:
+        """
+        Returns the warm surface for a compressed frame, decompressing it if it is cold
+        """
+        key = id(frame)
+
+        surface = self.lookup(key)
+        if surface is None:
+            surface = frame.decompress()
+            self.store(key, surface, frame)
+        return surface
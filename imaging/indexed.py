@@ -0,0 +1,116 @@
+"""
+Indexed surfaces
+
+An IndexedSurface is an 8-bit copy of an image, where every pixel is an index into the surface's 256 entry
+palette. Recoloring (applying a Palette, or cycling colors for effects like water shimmer) then only rewrites
+palette entries, costing the same no matter how large the image is, and never touches pixel data.
+
+Palette entries are grouped into bands by KEY_HUES, so colors sharing a key hue sit next to each other and
+can be rotated together.
+"""
+import pygame
+
+import numpy as np
+
+from imaging.constants import KEY_HUES
+from imaging.palette import Palette, pack_colors, unpack_colors, rgb_to_hsv
+
+from typing import Dict, List
+
+
+class IndexedSurface:
+    """
+    IndexedSurface converts an image into an 8-bit indexed surface which is recolored through its palette
+    """
+
+    TRANSPARENT_INDEX: int = 0
+    MAX_COLORS: int = 255  # Index 0 is reserved for transparency
+
+    def __init__(self, image: pygame.Surface, tolerance: int = 3):
+        """
+        Creates an indexed surface from an image
+
+        Pixels with any alpha are treated as opaque, since indexed surfaces only support a transparent colorkey
+
+        :param image: The image to index; it may use at most 255 distinct colors
+        :param tolerance: How far (in degrees) a color's hue may be from a key hue to join that key hue's band
+        """
+        pixels = pygame.surfarray.array3d(image)
+        visible = pygame.surfarray.array_alpha(image) != 0
+
+        (keys, inverse) = np.unique(pack_colors(pixels[visible]), return_inverse=True)
+        if keys.size > IndexedSurface.MAX_COLORS:
+            raise ValueError(f"Image uses {keys.size} colors, indexed surfaces support {IndexedSurface.MAX_COLORS}")
+
+        colors = unpack_colors(keys)
+        (h, s, v) = rgb_to_hsv(colors)
+        hues = np.rint(h * 360.0)
+
+        # Group colors by key hue band (darkest first within a band), with every other color after the bands
+        # Palette entry ranges of each key hue band
+        self.bands: Dict[KEY_HUES, range] = {}
+        groups: List[np.ndarray] = []
+        unbanded = np.ones(keys.size, dtype=bool)
+        start = 1
+        for key_hue in KEY_HUES:
+            distance = np.abs((hues - key_hue.value + 180) % 360 - 180)
+            members = np.flatnonzero(unbanded & (s > 0) & (distance <= tolerance))
+            members = members[np.argsort(v[members], kind="stable")]
+            unbanded[members] = False
+
+            self.bands[key_hue] = range(start, start + members.size)
+            groups.append(members)
+            start = start + members.size
+        groups.append(np.flatnonzero(unbanded))
+        order = np.concatenate(groups)
+
+        # Palette entry index for each unique color
+        entries = np.empty(keys.size, dtype=np.uint8)
+        entries[order] = np.arange(1, keys.size + 1)
+
+        self.base_colors: np.ndarray = colors[order]
+        self.colors: np.ndarray = self.base_colors.copy()
+
+        indices = np.full(visible.shape, IndexedSurface.TRANSPARENT_INDEX, dtype=np.uint8)
+        indices[visible] = entries[inverse.ravel()]
+
+        self.surface: pygame.Surface = pygame.Surface(image.get_size(), 0, 8)
+        pygame.surfarray.blit_array(self.surface, indices)
+        self.surface.set_colorkey(IndexedSurface.TRANSPARENT_INDEX)
+        self.update_palette()
+
+    def update_palette(self) -> None:
+        """
+        Writes the current colors into the surface's palette
+        """
+        self.surface.set_palette([(0, 0, 0)] + [tuple(color) for color in self.colors.tolist()])
+
+    def apply_palette(self, palette: Palette) -> None:
+        """
+        Recolors the surface with a palette, converting only the palette entries
+        """
+        self.colors = palette.convert_colors(self.base_colors)
+        self.update_palette()
+
+    def cycle(self, palettes: List[Palette], step: int) -> None:
+        """
+        Applies the palette for a step of a repeating cycle, i.e. once per frame for a team color pulse
+        """
+        self.apply_palette(palettes[step % len(palettes)])
+
+    def rotate_band(self, key_hue: KEY_HUES, steps: int = 1) -> None:
+        """
+        Rotates the current colors within a key hue band, i.e. for a water shimmer
+        """
+        band = self.bands[key_hue]
+        # Colors are stored from palette entry 1 onwards, since entry 0 is the transparent index
+        colors = slice(band.start - 1, band.stop - 1)
+        self.colors[colors] = np.roll(self.colors[colors], steps, axis=0)
+        self.update_palette()
+
+    def reset(self) -> None:
+        """
+        Restores the image's original colors
+        """
+        self.colors = self.base_colors.copy()
+        self.update_palette()
@@ -0,0 +1,90 @@
+"""
+Slice manifests
+
+Spritesheets do not change between releases, so scanning their alpha on every launch is wasted work. A slice
+manifest is a sidecar json file stored next to a sheet (i.e. sheet.png.slices.json) which records the frame
+rects found for each break coefficient, along with a hash of the sheet's contents. When the hash still
+matches, the rects are reused as is.
+"""
+import hashlib
+import json
+import logging
+import os
+import pygame
+
+from typing import Dict, List, Optional
+
+
+class SliceManifest:
+    """
+    SliceManifest reads and writes the sidecar manifest of a single spritesheet file
+    """
+
+    VERSION: int = 1
+    EXTENSION: str = ".slices.json"
+
+    def __init__(self, filename: str):
+        """
+        :param filename: The spritesheet's filename; the manifest lives beside it
+        """
+        self.logger = logging.getLogger(__name__)
+        self.filename: str = filename
+        self.path: str = f"{filename}{SliceManifest.EXTENSION}"
+
+    @staticmethod
+    def digest(contents: bytes) -> str:
+        """
+        Returns the hash of a spritesheet file's contents
+        """
+        return hashlib.blake2b(contents, digest_size=16).hexdigest()
+
+    def read(self, digest: str) -> Dict[str, List]:
+        """
+        Returns the stored slices by break coefficient, or nothing if the manifest is missing or stale
+        """
+        if not os.path.exists(self.path):
+            return {}
+
+        try:
+            with open(self.path, "r") as manifest_file:
+                manifest = json.load(manifest_file)
+        except (OSError, ValueError):
+            self.logger.warning(f"Slice manifest {self.path} is unreadable, ignoring")
+            return {}
+
+        if manifest.get("version") != SliceManifest.VERSION or manifest.get("digest") != digest:
+            self.logger.debug(f"Slice manifest {self.path} is stale, ignoring")
+            return {}
+
+        return manifest.get("slices", {})
+
+    def lookup(self, digest: str, break_coefficient: int) -> Optional[List[List[pygame.Rect]]]:
+        """
+        Returns the stored frame rects for a break coefficient, or None if they are not stored for these contents
+        """
+        rows = self.read(digest).get(str(break_coefficient))
+        if rows is None:
+            return None
+
+        return [[pygame.Rect(*rect) for rect in row] for row in rows]
+
+    def store(self, digest: str, break_coefficient: int, rects: List[List[pygame.Rect]]) -> None:
+        """
+        Stores frame rects for a break coefficient, keeping rects stored for other coefficients of these contents
+
+        The manifest is written to a temporary file and moved into place, so readers never see a partial manifest.
+        A manifest which cannot be written is only a missed optimization, so the failure is logged rather than raised.
+        """
+        slices = self.read(digest)
+        slices[str(break_coefficient)] = [[list(rect) for rect in row] for row in rects]
+
+        manifest = {"version": SliceManifest.VERSION, "digest": digest, "slices": slices}
+        temporary_path = f"{self.path}.tmp"
+        try:
+            with open(temporary_path, "w") as manifest_file:
+                json.dump(manifest, manifest_file)
+            os.replace(temporary_path, self.path)
+        except OSError as error:
+            self.logger.warning(f"Slice manifest {self.path} could not be written: {error}")
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
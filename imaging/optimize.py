@@ -0,0 +1,149 @@
+"""
+Display format optimization
+
+Blits are fastest when the source surface already matches the display format, and fastest of all when no
+per-pixel blending is needed. SurfaceOptimizer inspects a surface's alpha channel and converts it into the
+cheapest display format that still draws identically:
+
+    opaque        -> convert()
+    binary alpha  -> convert() with an RLE accelerated colorkey
+    partial alpha -> convert_alpha(), optionally premultiplied
+
+Optimized surfaces are remembered per source surface, so sprites built from the same surface share one optimized
+surface, while sprites built from separately loaded (even identical) images each get their own, and may be painted in
+place independently. A source which was modified in place (i.e. painted) is optimized afresh.
+"""
+import pygame
+import weakref
+
+import numpy as np
+
+from threading import Lock
+
+from imaging.surfaceutil import surface_digest
+
+from typing import Tuple
+
+
+class SurfaceOptimizer:
+    """
+    Converts surfaces to the fastest matching display format
+    """
+
+    OPAQUE: str = "opaque"
+    BINARY: str = "binary"
+    ALPHA: str = "alpha"
+
+    # Preferred colorkey for binary alpha surfaces, used unless an opaque pixel already has this color
+    COLORKEY: int = 0xFF00FF
+
+    # (source id, source colorkey, premultiply) -> optimized surface, kept while the optimized surface is in use
+    optimized: "weakref.WeakValueDictionary[Tuple, pygame.Surface]" = weakref.WeakValueDictionary()
+    # Optimized surface -> (its source, digest of the source, digest of its own contents) when created, to catch a
+    # reused source id and surfaces modified in place
+    results: "weakref.WeakKeyDictionary[pygame.Surface, Tuple[weakref.ref, str, str]]" = weakref.WeakKeyDictionary()
+    lock: Lock = Lock()
+
+    @staticmethod
+    def can_optimize(surface: pygame.Surface) -> bool:
+        """
+        Returns whether a surface can be converted to the display format
+
+        Conversion needs a display mode, and is skipped for subsurfaces (i.e. atlas frames, which are views
+        of their page) and 8 bit surfaces (i.e. indexed surfaces, whose palette is changed in place).
+        """
+        return pygame.display.get_surface() is not None and surface.get_parent() is None and surface.get_bitsize() > 8
+
+    @staticmethod
+    def alpha_mode(surface: pygame.Surface) -> str:
+        """
+        Returns whether a surface is opaque, has binary (fully opaque or fully transparent) alpha, or needs
+        per-pixel alpha
+        """
+        if not surface.get_flags() & pygame.SRCALPHA:
+            return SurfaceOptimizer.BINARY if surface.get_colorkey() is not None else SurfaceOptimizer.OPAQUE
+
+        alphas = pygame.surfarray.array_alpha(surface)
+        if np.all(alphas == 255):
+            return SurfaceOptimizer.OPAQUE
+        if np.all((alphas == 0) | (alphas == 255)):
+            return SurfaceOptimizer.BINARY
+        return SurfaceOptimizer.ALPHA
+
+    @staticmethod
+    def find_colorkey(surface: pygame.Surface, alphas: np.ndarray) -> int:
+        """
+        Returns a packed RGB color no opaque pixel of the surface uses
+
+        :param surface: A 24 or 32 bit surface
+        :param alphas: The surface's alpha values
+        """
+        pixels = pygame.surfarray.array3d(surface)[alphas == 255].astype(np.int64)
+        used = np.unique((pixels[:, 0] << 16) | (pixels[:, 1] << 8) | pixels[:, 2])
+
+        if SurfaceOptimizer.COLORKEY not in used:
+            return SurfaceOptimizer.COLORKEY
+
+        # used is sorted, so the first index which doesn't hold its own value is a free color
+        gaps = np.flatnonzero(used != np.arange(len(used)))
+        return int(gaps[0]) if len(gaps) else len(used)
+
+    @staticmethod
+    def optimize(surface: pygame.Surface, premultiply: bool = False) -> pygame.Surface:
+        """
+        Returns the surface converted to the fastest matching display format, or the surface itself when it
+        can't be optimized
+
+        :param surface: The surface to optimize
+        :param premultiply: Premultiply per-pixel alpha; such surfaces must be blitted with BLEND_PREMULTIPLIED
+        """
+        if not SurfaceOptimizer.can_optimize(surface):
+            return surface
+
+        with SurfaceOptimizer.lock:
+            if surface in SurfaceOptimizer.results:
+                return surface
+
+        source_digest = surface_digest(surface)
+        cache_key = (id(surface), surface.get_colorkey(), premultiply)
+        with SurfaceOptimizer.lock:
+            optimized = SurfaceOptimizer.optimized.get(cache_key)
+            result = SurfaceOptimizer.results.get(optimized) if optimized is not None else None
+        if result is not None:
+            (source, cached_source_digest, result_digest) = result
+            if (
+                source() is surface
+                and cached_source_digest == source_digest
+                and surface_digest(optimized) == result_digest
+            ):
+                return optimized
+
+        mode = SurfaceOptimizer.alpha_mode(surface)
+        if mode == SurfaceOptimizer.OPAQUE:
+            optimized = surface.convert()
+        elif mode == SurfaceOptimizer.BINARY and not surface.get_flags() & pygame.SRCALPHA:
+            optimized = surface.convert()
+            optimized.set_colorkey(surface.get_colorkey(), pygame.RLEACCEL)
+        elif mode == SurfaceOptimizer.BINARY:
+            keyed = surface.copy()
+            alphas = pygame.surfarray.array_alpha(keyed)
+            colorkey = SurfaceOptimizer.find_colorkey(keyed, alphas)
+            key = ((colorkey >> 16) & 0xFF, (colorkey >> 8) & 0xFF, colorkey & 0xFF)
+
+            pixels = pygame.surfarray.pixels3d(keyed)
+            pixels[alphas == 0] = key
+            del pixels
+
+            optimized = keyed.convert()
+            optimized.set_colorkey(key, pygame.RLEACCEL)
+        else:
+            optimized = surface.convert_alpha()
+            if premultiply:
+                optimized = optimized.premul_alpha()
+
+        result_digest = surface_digest(optimized)
+        with SurfaceOptimizer.lock:
+            SurfaceOptimizer.optimized[cache_key] = optimized
+            SurfaceOptimizer.results[optimized] = (weakref.ref(surface), source_digest, result_digest)
+
+        return optimized
@@ -0,0 +1,204 @@
+"""
+Paint cache
+
+Palette painting is expensive, but the same image is usually painted with the same palette many times over
+(i.e. every time a unit spawns). The PaintCache sits in front of Palette.paint_image and hands back the
+already painted surface when it has seen the image and palette before.
+
+Painted surfaces are shared between callers, so they should be treated as read only.
+
+The DiskPaintCache persists painted images between launches as raw RGBA arrays, so a warm start maps them back in
+without any palette math.
+"""
+import glob
+import hashlib
+import io
+import logging
+import os
+import pygame
+
+import numpy as np
+
+from imaging.palette import Palette
+from imaging.surfaceutil import SurfaceLRU, surface_digest
+
+from typing import Dict, List
+
+
+class PaintCache(SurfaceLRU):
+    """
+    Least recently used cache of painted surfaces, bounded by the number of bytes of pixel data held
+    """
+
+    DEFAULT_MAX_BYTES: int = 64 * 1024 * 1024
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Creates a paint cache
+
+        :param max_bytes: The number of bytes of surface data the cache may hold before evicting entries
+        """
+        super().__init__(max_bytes)
+
+    def paint_image(self, palette: Palette, image: pygame.Surface, unique_colors: bool = False) -> pygame.Surface:
+        """
+        Returns the image painted with the palette, painting it only if it is not already cached
+
+        :param palette: The palette to paint with
+        :param image: The image to paint
+        :param unique_colors: Passed through to Palette.paint_image on a miss
+        """
+        key = (surface_digest(image), palette.digest)
+
+        surface = self.lookup(key)
+        if surface is None:
+            surface = palette.paint_image(image, unique_colors)
+            self.store(key, surface)
+        return surface
+
+
+class DiskPaintCache:
+    """
+    Persistent cache of painted image files, bounded by the number of bytes stored on disk
+
+    Entries are keyed by the palette engine version, the source file's path and contents, and the palette.
+    Entries from other engine versions, or for older contents of the same file, are removed automatically.
+    """
+
+    DEFAULT_MAX_BYTES: int = 256 * 1024 * 1024
+    EXTENSION: str = ".npy"
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Creates a disk paint cache, creating its directory if needed
+
+        :param directory: The directory to store painted images in
+        :param max_bytes: The number of bytes the cache may store before removing the least recently used entries
+        """
+        self.logger = logging.getLogger(__name__)
+        self.directory: str = directory
+        self.max_bytes: int = max_bytes
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self.prune_stale()
+
+    @staticmethod
+    def digest(data: bytes) -> str:
+        """
+        Returns a short hex hash of some bytes
+        """
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the cache counters
+        """
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def entries(self) -> List[str]:
+        """
+        Returns the paths of every entry in the cache directory
+        """
+        return glob.glob(os.path.join(self.directory, f"*{DiskPaintCache.EXTENSION}"))
+
+    def prune_stale(self) -> None:
+        """
+        Removes entries painted by another version of the palette engine
+        """
+        current = f"{Palette.ENGINE_VERSION}-"
+        for path in self.entries():
+            if not os.path.basename(path).startswith(current):
+                self.logger.debug(f"Removing stale paint cache entry {path}")
+                os.remove(path)
+
+    def paint_file(self, palette: Palette, filename: str, unique_colors: bool = False) -> pygame.Surface:
+        """
+        Returns the image file painted with the palette, loading it from disk when it has been painted before
+
+        :param palette: The palette to paint with
+        :param filename: The image file to load and paint
+        :param unique_colors: Passed through to Palette.paint_image on a miss
+        """
+        with open(filename, "rb") as image_file:
+            contents = image_file.read()
+
+        prefix = "-".join(
+            [
+                str(Palette.ENGINE_VERSION),
+                DiskPaintCache.digest(os.path.abspath(filename).encode("utf-8")),
+                palette.digest,
+            ]
+        )
+        path = os.path.join(self.directory, f"{prefix}-{DiskPaintCache.digest(contents)}{DiskPaintCache.EXTENSION}")
+
+        if os.path.exists(path):
+            try:
+                surface = DiskPaintCache.load(path)
+                os.utime(path)  # Mark as recently used
+                self.hits = self.hits + 1
+                return surface
+            except (OSError, ValueError):
+                self.logger.warning(f"Paint cache entry {path} is unreadable, repainting")
+                os.remove(path)
+
+        self.misses = self.misses + 1
+        image = pygame.image.load(io.BytesIO(contents), filename)
+        surface = palette.paint_image(image, unique_colors)
+
+        # Entries for older contents of this file will never be hit again
+        for stale in glob.glob(os.path.join(self.directory, f"{prefix}-*{DiskPaintCache.EXTENSION}")):
+            os.remove(stale)
+
+        self.store(path, surface)
+        self.enforce_budget()
+        return surface
+
+    @staticmethod
+    def load(path: str) -> pygame.Surface:
+        """
+        Memory maps a stored (height, width, 4) RGBA array into a surface
+
+        When a display mode is set, the surface is converted to the display format, exactly like the surfaces
+        Palette.paint_image returns on a miss; otherwise it shares the mapped buffer.
+        """
+        pixels = np.load(path, mmap_mode="c")  # Copy on write, so the surface may be drawn on safely
+        (height, width, depth) = pixels.shape
+        if depth != 4:
+            raise ValueError(f"Paint cache entry {path} is not RGBA")
+
+        surface = pygame.image.frombuffer(pixels, (width, height), "RGBA")
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha()
+        return surface
+
+    @staticmethod
+    def store(path: str, surface: pygame.Surface) -> None:
+        """
+        Stores a surface as a raw (height, width, 4) RGBA array
+        """
+        (width, height) = surface.get_size()
+        pixels = np.frombuffer(pygame.image.tostring(surface, "RGBA"), dtype=np.uint8).reshape(height, width, 4)
+
+        # Write then rename, so a partially written entry is never picked up
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "wb") as entry_file:
+            np.save(entry_file, pixels)
+        os.replace(temporary_path, path)
+
+    def enforce_budget(self) -> None:
+        """
+        Removes the least recently used entries until the cache fits its byte budget
+        """
+        entries = sorted(self.entries(), key=os.path.getmtime)
+        total = sum(os.path.getsize(path) for path in entries)
+
+        while entries and total > self.max_bytes:
+            path = entries.pop(0)
+            total = total - os.path.getsize(path)
+            os.remove(path)
+            self.evictions = self.evictions + 1
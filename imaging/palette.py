@@ -1,10 +1,24 @@
 import pygame
+import atexit
 import colorsys
+import hashlib
+import multiprocessing
+import os
+import threading
 
 import numpy as np
 
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Tuple, Dict
 
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # pragma: no cover
+    shared_memory = None  # Python < 3.8; paint_variants falls back to painting serially
+
+# Component order of (v, t, p, q) for each sextant of the hue wheel, mirroring colorsys.hsv_to_rgb
+HSV_SEXTANT_COMPONENTS: np.ndarray = np.array([[0, 1, 2], [3, 0, 2], [2, 0, 1], [2, 3, 0], [1, 2, 0], [0, 2, 3]])
+
 
 class PaletteColor:
     __slots__ = ["h", "s", "v"]
@@ -26,23 +40,98 @@ class PaletteColor:
         return (round(r * 255.0), round(g * 255.0), round(b * 255.0))
 
 
+def pack_colors(colors: np.ndarray) -> np.ndarray:
+    """
+    Packs an (n, 3) array of RGB colors into an array of single integer keys
+    """
+    colors = colors.astype(np.int64)
+    return (colors[:, 0] << 16) | (colors[:, 1] << 8) | colors[:, 2]
+
+
+def unpack_colors(keys: np.ndarray) -> np.ndarray:
+    """
+    Unpacks an array of integer keys created by pack_colors back into an (n, 3) array of RGB colors
+    """
+    return np.stack([(keys >> 16) & 0xFF, (keys >> 8) & 0xFF, keys & 0xFF], axis=1)
+
+
+def rgb_to_hsv(colors: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Converts an (n, 3) array of RGB colors to arrays of hue (0-1), saturation (0-1) and value
+
+    Mirrors colorsys.rgb_to_hsv operation for operation, so results match it exactly
+    """
+    rgb = colors.astype(np.float64)
+    (r, g, b) = (rgb[:, 0], rgb[:, 1], rgb[:, 2])
+
+    maxc = rgb.max(axis=1)
+    minc = rgb.min(axis=1)
+    rangec = maxc - minc
+    chromatic = rangec != 0
+    safe_range = np.where(chromatic, rangec, 1.0)
+    safe_max = np.where(maxc != 0, maxc, 1.0)
+
+    s = np.where(chromatic, rangec / safe_max, 0.0)
+    rc = (maxc - r) / safe_range
+    gc = (maxc - g) / safe_range
+    bc = (maxc - b) / safe_range
+    h = np.where(r == maxc, bc - gc, np.where(g == maxc, 2.0 + rc - bc, 4.0 + gc - rc))
+    h = np.where(chromatic, np.mod(h / 6.0, 1.0), 0.0)
+
+    return (h, s, maxc)
+
+
+def hsv_to_rgb(h: np.ndarray, s: np.ndarray, v: np.ndarray) -> np.ndarray:
+    """
+    Converts arrays of hue (0-1), saturation (0-1) and value to an (n, 3) array of unrounded RGB colors
+
+    Mirrors colorsys.hsv_to_rgb operation for operation, so results match it exactly
+    """
+    i = np.trunc(h * 6.0)
+    f = (h * 6.0) - i
+    p = v * (1.0 - s)
+    q = v * (1.0 - s * f)
+    t = v * (1.0 - s * (1.0 - f))
+    sextant = np.mod(i.astype(np.intp), 6)
+
+    components = np.stack([v, t, p, q])
+    selection = HSV_SEXTANT_COMPONENTS[sextant]
+    indices = np.arange(v.shape[0])
+    return np.stack([components[selection[:, c], indices] for c in range(0, 3)], axis=1)
+
+
 class Palette:
-    __slots__ = ["hues", "tolerance"]
+    __slots__ = ["hues", "tolerance", "colors"]
 
     """
     Palette class represents a particular palette, with logic to support re-coloring sprites
     """
 
-    def __init__(self, hues: Dict[int, int], tolerance: int = 3):
+    # Bump whenever the painting math changes, so persisted paints are invalidated
+    ENGINE_VERSION: int = 1
+
+    # Worker processes shared by every paint_variants call, created on first use (see Palette.executor)
+    variant_executor: ProcessPoolExecutor = None
+    variant_workers: int = 0
+    variant_lock: threading.Lock = threading.Lock()
+
+    def __init__(
+        self, hues: Dict[int, int], tolerance: int = 3, colors: Dict[Tuple[int, int, int], Tuple[int, int, int]] = None
+    ):
         """
         Specify a tolerance to give some wiggle room to the math
 
         
         : param hues: A dictionary map of source hue -> target hue
         : param tolerance: An integer representing the tolerance level for source
+        : param colors: A dictionary map of exact source RGB -> target RGB, which takes precedence over hues
         """
+        if colors is None:
+            colors = {}
+
         self.hues: Dict[int, int] = hues
         self.tolerance: int = tolerance
+        self.colors: Dict[Tuple[int, int, int], Tuple[int, int, int]] = colors
 
         # Expand our dict to include tolerances
         if tolerance > 0:
@@ -52,50 +141,346 @@ class Palette:
                     target_hue = self.hues.get(hue) - (hue - tolerated_hue)
                     self.hues[tolerated_hue % 360] = target_hue % 360
 
-    def paint_image(self, image: pygame.Surface) -> pygame.Surface:
+    @property
+    def digest(self) -> str:
+        """
+        Returns a canonical hash of this palette's mappings, equal for palettes which paint identically
+        """
+        canonical = repr((sorted(self.hues.items()), self.tolerance, sorted(self.colors.items())))
+        return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+    def hue_table(self) -> np.ndarray:
+        """
+        Returns a dense lookup array of target hues (as fractions of 360) indexed by source hue
+
+        The table holds 361 entries since a rounded hue may land on 360 before wrapping
+        """
+        return np.array([self.hues.get(hue, hue) / 360.0 for hue in range(0, 361)], dtype=np.float64)
+
+    def color_table(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the exact color map as a sorted array of packed source colors and an array of matching targets
+        """
+        if not self.colors:
+            return (np.empty(0, dtype=np.int64), np.empty((0, 3), dtype=np.int64))
+
+        sources = pack_colors(np.array(list(self.colors.keys())))
+        targets = np.array(list(self.colors.values()), dtype=np.int64)
+        order = np.argsort(sources)
+        return (sources[order], targets[order])
+
+    def paint_image(
+        self,
+        image: pygame.Surface,
+        unique_colors: bool = False,
+        in_place: bool = False,
+        destination: pygame.Surface = None,
+    ) -> pygame.Surface:
         """
         Paints the source image with this palette, returning a new surface
+
+        :param image: The image to paint
+        :param unique_colors: Convert each distinct color once rather than every pixel; best for pixel art
+        :param in_place: Paint the image's own pixels through a pixels3d view and return the image itself
+        :param destination: Paint into this existing surface of the same size (its alpha is left untouched)
         """
+        if in_place or destination is not None:
+            return self.paint_into(image, image if in_place else destination, unique_colors)
+
         # Store the image's alpha
-        alphas = pygame.surfarray.array_alpha(image)
-        # Convert image to pixel array and swap colors
-        pixel_array = self.convert_pixel_array(pygame.surfarray.array3d(image))
+        alphas = Palette.transparency(image)
+        # Convert image to pixel array and swap colors, leaving fully transparent pixels alone
+        pixel_array = self.convert_pixel_array(pygame.surfarray.array3d(image), alphas, unique_colors)
+        return Palette.build_surface(pixel_array, alphas)
+
+    def paint_into(
+        self, image: pygame.Surface, destination: pygame.Surface, unique_colors: bool = False
+    ) -> pygame.Surface:
+        """
+        Paints the image's RGB into the destination's pixels through referenced views, without building surfaces
+
+        The destination may be the image itself. Alpha is only read (to skip transparent pixels), never written.
+        Colorkeyed pixels count as transparent, so they keep the colorkey. Both surfaces must be 24 or 32 bit,
+        since pixels3d views are used.
+        """
+        if image.get_size() != destination.get_size():
+            raise ValueError(f"Destination size {destination.get_size()} does not match image size {image.get_size()}")
+
+        alphas = None
+        if image.get_flags() & pygame.SRCALPHA:
+            alphas = pygame.surfarray.pixels_alpha(image)
+        elif image.get_colorkey() is not None:
+            alphas = pygame.surfarray.array_colorkey(image)
+
+        destination_pixels = pygame.surfarray.pixels3d(destination)
+        source_pixels = destination_pixels
+        if destination is not image:
+            source_pixels = pygame.surfarray.pixels3d(image)
+
+        self.convert_pixel_array(source_pixels, alphas, unique_colors, out=destination_pixels)
+
+        # Unlock the surfaces by removing the references to their pixels
+        del source_pixels
+        del destination_pixels
+        del alphas
+        return destination
+
+    def paint_many(self, images: List[pygame.Surface], unique_colors: bool = False) -> List[pygame.Surface]:
+        """
+        Paints many images with this palette in a single conversion pass, returning new surfaces in the same order
+
+        Images of any size may be mixed; their pixels are packed into one array, converted, then split back apart
+
+        :param images: The images to paint, i.e. the frames of an animation
+        :param unique_colors: Convert each distinct color once rather than every pixel; best for pixel art
+        """
+        if not images:
+            return []
+
+        pixel_arrays = [pygame.surfarray.array3d(image) for image in images]
+        alpha_arrays = [Palette.transparency(image) for image in images]
+
+        # Pack every image's pixels into a single column so all frames convert together
+        packed_pixels = np.concatenate([pixels.reshape(-1, 1, 3) for pixels in pixel_arrays])
+        packed_alphas = np.concatenate([alphas.reshape(-1, 1) for alphas in alpha_arrays])
+        converted = self.convert_pixel_array(packed_pixels, packed_alphas, unique_colors)
+
+        offsets = np.cumsum([alphas.size for alphas in alpha_arrays])[:-1]
+        return [
+            Palette.build_surface(pixels.reshape(alphas.shape + (3,)), alphas)
+            for (pixels, alphas) in zip(np.split(converted, offsets), alpha_arrays)
+        ]
+
+    def paint_sheet(self, sheet: List[List[pygame.Surface]], unique_colors: bool = False) -> List[List[pygame.Surface]]:
+        """
+        Paints a fully sliced spritesheet (rows of frames) with this palette in a single conversion pass
+        """
+        painted = iter(self.paint_many([frame for row in sheet for frame in row], unique_colors))
+        return [[next(painted) for _ in row] for row in sheet]
+
+    @staticmethod
+    def paint_variants(
+        image: pygame.Surface, palettes: List["Palette"], unique_colors: bool = False, max_workers: int = None
+    ) -> List[pygame.Surface]:
+        """
+        Paints one image with many palettes in parallel across a process pool, returning surfaces in palette order
+
+        Pixel buffers are handed to the workers through shared memory rather than pickled; only the palettes are
+        sent. Surfaces are rebuilt in this process once every variant has been painted. The worker processes are
+        kept between calls; see Palette.executor.
+
+        :param image: The image to paint
+        :param palettes: The palettes to paint the image with, i.e. one per team
+        :param unique_colors: Convert each distinct color once rather than every pixel; best for pixel art
+        :param max_workers: The number of worker processes, defaults to one per core
+        """
+        if not palettes:
+            return []
+
+        if shared_memory is None:  # pragma: no cover
+            return [palette.paint_image(image, unique_colors) for palette in palettes]
+
+        pixels = pygame.surfarray.array3d(image)
+        alphas = Palette.transparency(image)
+        (width, height) = alphas.shape
+        pixel_bytes = width * height * 3
+
+        executor = Palette.executor(max_workers)
+
+        source = shared_memory.SharedMemory(create=True, size=max(1, pixel_bytes + alphas.size))
+        output = shared_memory.SharedMemory(create=True, size=max(1, pixel_bytes * len(palettes)))
+        try:
+            np.ndarray(pixels.shape, np.uint8, buffer=source.buf)[...] = pixels
+            np.ndarray(alphas.shape, np.uint8, buffer=source.buf, offset=pixel_bytes)[...] = alphas
+
+            futures = [
+                executor.submit(
+                    Palette.paint_shared_variant,
+                    palette,
+                    (width, height),
+                    index,
+                    source.name,
+                    output.name,
+                    unique_colors,
+                )
+                for (index, palette) in enumerate(palettes)
+            ]
+            for future in futures:
+                future.result()
+
+            variants = np.ndarray((len(palettes), width, height, 3), np.uint8, buffer=output.buf)
+            surfaces = [Palette.build_surface(variant, alphas) for variant in variants]
+            del variants  # Release the view so the shared memory can close
+        finally:
+            source.close()
+            source.unlink()
+            output.close()
+            output.unlink()
+
+        return surfaces
+
+    @staticmethod
+    def executor(max_workers: int = None) -> ProcessPoolExecutor:
+        """
+        Returns the process pool paint_variants runs on, creating it on first use
+
+        Starting worker processes costs far more than painting a sprite, so one pool is kept for the life of the
+        program (it is shut down at exit, or explicitly with Palette.shutdown_executor). Asking for a different
+        number of workers replaces the pool.
+
+        Workers are started with the spawn method rather than forked: forking once Window's render and logic threads
+        are running could copy a lock they hold, deadlocking the worker.
+
+        :param max_workers: The number of worker processes, defaults to one per core
+        """
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        max_workers = max(1, max_workers)
+
+        with Palette.variant_lock:
+            if Palette.variant_executor is not None and Palette.variant_workers != max_workers:
+                Palette.variant_executor.shutdown(wait=True)
+                Palette.variant_executor = None
+
+            if Palette.variant_executor is None:
+                Palette.variant_executor = ProcessPoolExecutor(
+                    max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+                Palette.variant_workers = max_workers
+
+            return Palette.variant_executor
+
+    @staticmethod
+    def shutdown_executor() -> None:
+        """
+        Shuts down paint_variants' process pool, if it was started; the next paint_variants call starts a new one
+        """
+        with Palette.variant_lock:
+            if Palette.variant_executor is not None:
+                Palette.variant_executor.shutdown(wait=True)
+                (Palette.variant_executor, Palette.variant_workers) = (None, 0)
+
+    @staticmethod
+    def paint_shared_variant(
+        palette: "Palette", size: Tuple[int, int], index: int, source_name: str, output_name: str, unique_colors: bool
+    ) -> None:
+        """
+        Worker for paint_variants; converts the shared source pixels into this palette's slot of the shared output
+        """
+        (width, height) = size
+        pixel_bytes = width * height * 3
+
+        source = shared_memory.SharedMemory(name=source_name)
+        output = shared_memory.SharedMemory(name=output_name)
+        try:
+            pixels = np.ndarray((width, height, 3), np.uint8, buffer=source.buf)
+            alphas = np.ndarray((width, height), np.uint8, buffer=source.buf, offset=pixel_bytes)
+            variant = np.ndarray((width, height, 3), np.uint8, buffer=output.buf, offset=pixel_bytes * index)
+            palette.convert_pixel_array(pixels, alphas, unique_colors, out=variant)
+            del pixels, alphas, variant  # Release the views so the shared memory can close
+        finally:
+            source.close()
+            output.close()
+
+    @staticmethod
+    def transparency(image: pygame.Surface) -> np.ndarray:
+        """
+        Returns a copy of the image's alpha values, where colorkeyed pixels are fully transparent
+        """
+        if not image.get_flags() & pygame.SRCALPHA and image.get_colorkey() is not None:
+            return pygame.surfarray.array_colorkey(image)
+        return pygame.surfarray.array_alpha(image)
+
+    @staticmethod
+    def build_surface(pixel_array: np.ndarray, alphas: np.ndarray) -> pygame.Surface:
+        """
+        Builds a per-pixel alpha surface from an RGB pixel array and an alpha array
+        """
         # Remap pixel array to surface and add alpha channel
         surface = pygame.Surface.convert_alpha(pygame.surfarray.make_surface(pixel_array))
         # Copy original alpha to new surface's alpha
         surface_alpha_reference = pygame.surfarray.pixels_alpha(surface)
         np.copyto(surface_alpha_reference, alphas)
         del surface_alpha_reference  # Unlock the surface by removing the reference to alphas
-        del alphas
         return surface
 
-    def convert_pixel_array(self, pixel_array: np.ndarray) -> np.ndarray:
+    def convert_pixel_array(
+        self, pixel_array: np.ndarray, alphas: np.ndarray = None, unique_colors: bool = False, out: np.ndarray = None
+    ) -> np.ndarray:
         """
         Converts an array of pixel RGB values based upon this palette's conversion
+
+        The conversion is fully vectorized, but gives the same results as convert_pixel on every pixel
+
+        :param pixel_array: A (width, height, 3) array of RGB values
+        :param alphas: An optional (width, height) array of alpha values; fully transparent pixels are not converted
+        :param unique_colors: Convert each distinct color once and scatter the results back to the pixels
+        :param out: An optional (width, height, 3) array to write into, which may be pixel_array itself
         """
-        shape = pixel_array.shape
-        (x, y, z) = shape
+        (x, y, z) = pixel_array.shape
+
+        if out is None:
+            out = pixel_array.copy()
+        elif out is not pixel_array:
+            np.copyto(out, pixel_array)
+
+        visible = None
+        if alphas is None:
+            # Convert the pixel array from 3d to 2d array
+            flat_pixels = pixel_array.reshape(x * y, z)
+        else:
+            # Boolean indexing walks the pixels in the same order as a reshape would
+            visible = alphas.reshape(x, y) != 0
+            flat_pixels = pixel_array[visible]
+
+        if unique_colors:
+            # Cost scales with the number of distinct colors rather than the number of pixels
+            (keys, inverse) = np.unique(pack_colors(flat_pixels), return_inverse=True)
+            converted = self.convert_colors(unpack_colors(keys).astype(pixel_array.dtype))[inverse.ravel()]
+        else:
+            converted = self.convert_colors(flat_pixels)
 
-        # Convert the pixel array from 3d to 2d array
-        pixel_array = pixel_array.reshape(x * y, z)
-        # Palette swap pixels
-        pixel_array = np.apply_along_axis(self.convert_pixel, 1, pixel_array)
         # Return to 3d for painting
-        pixel_array = pixel_array.reshape(x, y, z)
+        if visible is None:
+            out[...] = converted.reshape(x, y, z)
+        else:
+            out[visible] = converted
+        return out
 
-        # Manual loop version
-        # for i in range(0, shape[0]):
-        #     for j in range(0, shape[1]):
-        #         nc = self.convert_pixel(pixel_array[i, j])
-        #         pixel_array[i, j] = nc
+    def convert_colors(self, colors: np.ndarray) -> np.ndarray:
+        """
+        Converts an (n, 3) array of RGB colors, mirroring colorsys' math so results match convert_pixel exactly
+        """
+        (h, s, v) = rgb_to_hsv(colors)
 
-        return pixel_array
+        # Remap hues through the dense lookup table
+        h = self.hue_table()[np.rint(h * 360.0).astype(np.intp)]
+
+        converted = hsv_to_rgb(h, s, v)
+        converted = np.rint(converted).astype(colors.dtype)
+
+        # Exact color matches override the hue based conversion
+        (sources, targets) = self.color_table()
+        if sources.size > 0:
+            keys = pack_colors(colors)
+            positions = np.minimum(np.searchsorted(sources, keys), sources.size - 1)
+            matches = sources[positions] == keys
+            converted[matches] = targets[positions[matches]]
+
+        return converted
 
     def convert_pixel(self, color: Tuple[float, float, float]) -> Tuple[float, float, float]:
         """
         Converts a pixel based upon HSL value
         """
+        exact = self.colors.get(tuple(int(c) for c in color))
+        if exact is not None:
+            return exact
+
         (h, l, v) = colorsys.rgb_to_hsv(*color)
         true_hue = round(h * 360.0)
         (r, g, b) = colorsys.hsv_to_rgb(self.hues.get(true_hue, true_hue) / 360.0, l, v)
         return (round(r), round(g), round(b))
+
+
+atexit.register(Palette.shutdown_executor)
@@ -0,0 +1,162 @@
+"""
+Asset pipeline
+
+Loads and slices many spritesheet files at once across a thread or process pool. Finished assets are streamed
+back as they complete, so the first assets are usable before the whole set has loaded.
+
+    pipeline = AssetPipeline()
+    pipeline.submit("assets/hero.png", Spritesheet.BREAK_COEFFICIENT_TRANSPARENT, priority=0)
+    pipeline.submit("assets/scenery.png", Spritesheet.BREAK_COEFFICIENT_TRANSPARENT, priority=10)
+    for asset in pipeline.load():
+        ...
+"""
+import heapq
+import logging
+import os
+import pygame
+
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from imaging.dedup import FrameDeduplicator
+from imaging.spritesheet import Spritesheet
+
+from typing import Callable, Dict, Iterator, List, Tuple
+
+
+class LoadedAsset:
+    """
+    LoadedAsset is a spritesheet file which has been loaded and sliced by the pipeline
+    """
+
+    __slots__ = ["filename", "break_coefficient", "priority", "frames"]
+
+    def __init__(self, filename: str, break_coefficient: int, priority: int, frames: List[List[pygame.Surface]]):
+        self.filename: str = filename
+        self.break_coefficient: int = break_coefficient
+        self.priority: int = priority
+        self.frames: List[List[pygame.Surface]] = frames
+
+
+class AssetPipeline:
+    """
+    AssetPipeline loads and slices queued spritesheet files concurrently
+
+    Assets with a lower priority value are started first. Only as many files as there are workers are in flight
+    at once, so priorities are honored throughout the load rather than just at the start.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = None,
+        use_processes: bool = False,
+        manifest: bool = False,
+        progress: Callable[[int, int], None] = None,
+        deduplicator: FrameDeduplicator = None,
+    ):
+        """
+        Creates an asset pipeline
+
+        :param max_workers: The number of workers, defaults to one per core
+        :param use_processes: Decode in worker processes rather than threads; pixels are sent back as raw RGBA
+        :param manifest: Reuse (or create) the frame rects stored in each file's slice manifest
+        :param progress: Called with (loaded, total) every time an asset finishes loading
+        :param deduplicator: Share one surface between frames with identical pixels, across every loaded asset
+        """
+        self.logger = logging.getLogger(__name__)
+        self.max_workers: int = max_workers or os.cpu_count() or 1
+        self.use_processes: bool = use_processes
+        self.manifest: bool = manifest
+        self.progress: Callable[[int, int], None] = progress
+        self.deduplicator: FrameDeduplicator = deduplicator
+
+        # Queue entries are (priority, submission order, filename, break coefficient)
+        self.queue: List[Tuple[int, int, str, int]] = []
+        self.submitted: int = 0
+        self.loaded: int = 0
+
+    @property
+    def total(self) -> int:
+        """
+        Returns the number of assets submitted
+        """
+        return self.submitted
+
+    def submit(self, filename: str, break_coefficient: int, priority: int = 0) -> None:
+        """
+        Queues a spritesheet file to be loaded and sliced
+
+        :param filename: The filename to load
+        :param break_coefficient: The break coefficient for slicing
+        :param priority: Lower priorities are loaded first; ties load in submission order
+        """
+        heapq.heappush(self.queue, (priority, self.submitted, filename, break_coefficient))
+        self.submitted = self.submitted + 1
+
+    def load(self) -> Iterator[LoadedAsset]:
+        """
+        Loads every queued asset, yielding each one as soon as it has finished
+        """
+        executor: Executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        if self.use_processes:
+            executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+        in_flight: Dict[Future, Tuple[int, int, str, int]] = {}
+        with executor:
+            while self.queue or in_flight:
+                while self.queue and len(in_flight) < self.max_workers:
+                    entry = heapq.heappop(self.queue)
+                    in_flight[self.start(executor, entry[2], entry[3])] = entry
+
+                (finished, _) = wait(list(in_flight.keys()), return_when=FIRST_COMPLETED)
+                for future in sorted(finished, key=lambda future: in_flight[future]):
+                    (priority, _, filename, break_coefficient) = in_flight.pop(future)
+                    frames = future.result()
+                    if self.use_processes:
+                        frames = AssetPipeline.rebuild(*frames)
+                    if self.deduplicator is not None:
+                        frames = self.deduplicator.dedupe_sheet(frames)
+
+                    self.loaded = self.loaded + 1
+                    self.logger.debug(f"Loaded {filename} ({self.loaded}/{self.total})")
+                    if self.progress is not None:
+                        self.progress(self.loaded, self.total)
+
+                    yield LoadedAsset(filename, break_coefficient, priority, frames)
+
+    def load_all(self) -> Dict[str, List[List[pygame.Surface]]]:
+        """
+        Loads every queued asset, returning their frames by filename
+        """
+        return {asset.filename: asset.frames for asset in self.load()}
+
+    def start(self, executor: Executor, filename: str, break_coefficient: int) -> Future:
+        """
+        Starts loading a file on the executor
+        """
+        if self.use_processes:
+            return executor.submit(AssetPipeline.decode, filename, break_coefficient, self.manifest)
+        return executor.submit(Spritesheet.fully_slice_file, filename, break_coefficient, self.manifest)
+
+    @staticmethod
+    def decode(
+        filename: str, break_coefficient: int, manifest: bool
+    ) -> Tuple[Tuple[int, int], bytes, List[List[Tuple[int, int, int, int]]]]:
+        """
+        Process worker; loads and slices a file, returning its size, raw RGBA pixels and frame rects
+        """
+        (surface, rects) = Spritesheet.load_file(filename, break_coefficient, manifest)
+        return (
+            surface.get_size(),
+            pygame.image.tostring(surface, "RGBA"),
+            [[tuple(rect) for rect in row] for row in rects],
+        )
+
+    @staticmethod
+    def rebuild(
+        size: Tuple[int, int], pixels: bytes, rects: List[List[Tuple[int, int, int, int]]]
+    ) -> List[List[pygame.Surface]]:
+        """
+        Rebuilds the frames of a file decoded by a process worker
+        """
+        surface = pygame.image.fromstring(pixels, size, "RGBA")
+        return Spritesheet.copy_frames(surface, [[pygame.Rect(rect) for rect in row] for row in rects])
@@ -1,88 +1,206 @@
 import pygame
 
+from bisect import bisect_right
+from itertools import accumulate
+
+from events import AnimationScheduler
 from interface.renderable import Renderable
-from interface import Anchor
-from threading import Thread
+from interface import Anchor, Trim, Transform
+from imaging.atlas import AtlasFrame
+from imaging.framestore import CompressedFrame, FramePool
+from imaging.optimize import SurfaceOptimizer
+from imaging.transformcache import TransformCache
+
+from typing import List, Union
 
-from typing import List
 
+class TransformMixin:
+    """
+    TransformMixin draws a renderable's source surface rotated, scaled or flipped through the shared TransformCache
 
-class Sprite(Renderable):
+    Should come before Renderable in resolution order
+    """
+
+    _transform: Transform = None
+
+    @property
+    def transform(self) -> Transform:
+        """
+        Returns the (quantized) transform, or None if untransformed
+        """
+        return self._transform
+
+    @transform.setter
+    def transform(self, transform: Transform) -> None:
+        """
+        Sets the transform; it is quantized so the anchor matches the cached surface exactly
+        """
+        if transform is not None:
+            transform = TransformCache.get_instance().quantize(transform)
+        self._transform = None if transform is None or transform.is_identity else transform
+
+    def transformed(self, surface: pygame.Surface) -> pygame.Surface:
+        """
+        Returns the surface with this renderable's transform applied
+        """
+        if self._transform is None:
+            return surface
+        return TransformCache.get_instance().transform(surface, self._transform)
+
+
+class Sprite(TransformMixin, Renderable):
     """
     Sprite represents a sprite
     """
 
-    def __init__(self, image: pygame.Surface, anchor: Anchor = Anchor.TOP_LEFT):
+    def __init__(
+        self,
+        image: Union[pygame.Surface, AtlasFrame],
+        anchor: Anchor = Anchor.TOP_LEFT,
+        trim: Trim = None,
+        optimize: bool = True,
+        transform: Transform = None,
+    ):
         """
         Creates an animated sprite
 
-        :param image: An image for this sprite
+        :param image: An image (or atlas frame) for this sprite
         :param anchor: The anchor position for this sprite image
+        :param trim: How the image was trimmed from its full frame, if it was
+        :param optimize: Convert the image to the fastest matching display format
+        :param transform: Rotation, scale and mirroring to draw the image with
         """
-        self._surface = image
+        self._surface = AtlasFrame.resolve(image)
+        if optimize:
+            self._surface = SurfaceOptimizer.optimize(self._surface)
         self._anchor = anchor
+        self._trim = trim
+        self.transform = transform
 
     @property
     def surface(self) -> pygame.Surface:
+        return self.transformed(self._surface)
+
+    @property
+    def source_surface(self) -> pygame.Surface:
         return self._surface
 
     @property
     def anchor(self) -> Anchor:
         return self._anchor
 
+    @property
+    def trim(self) -> Trim:
+        return self._trim
+
 
-class AnimatedSprite(Renderable):
+class AnimatedSprite(TransformMixin, Renderable):
     """
     AnimatedSprite supports animated sprites
     """
 
-    def __init__(self, sprites: List[pygame.Surface], frame_data: List[int] = None):
+    def __init__(
+        self,
+        sprites: List[Union[pygame.Surface, AtlasFrame]],
+        frame_data: List[int] = None,
+        trims: List[Trim] = None,
+        optimize: bool = True,
+        transform: Transform = None,
+        compress: bool = False,
+    ):
         """
         Creates an animated sprite
 
-        :param sprites: A list of sprites representing each frame of animation
-        :param frame_data: A list of integers representing the speed of each frame
+        :param sprites: A list of sprites (or atlas frames) representing each frame of animation
+        :param frame_data: A list of integers representing the speed of each frame, in frames per second
+        :param trims: A list of how each frame was trimmed from its full frame, if they were
+        :param optimize: Convert each frame to the fastest matching display format
+        :param transform: Rotation, scale and mirroring to draw every frame with
+        :param compress: Hold frames compressed, decompressing them into the shared FramePool when drawn
         """
         if frame_data is None:
             frame_data = [10]
 
         self.current_frame = 0
-        self.sprites = sprites
+        self.compressed: bool = compress
+        self.sprites: List[Union[pygame.Surface, CompressedFrame]] = [AtlasFrame.resolve(sprite) for sprite in sprites]
+        if compress:
+            self.sprites = [CompressedFrame.compress(sprite, optimize) for sprite in self.sprites]
+        elif optimize:
+            self.sprites = [SurfaceOptimizer.optimize(sprite) for sprite in self.sprites]
         self.frame_count = len(sprites)
         self.frame_data = frame_data
+        self.trims = trims
+        self.transform = transform
 
-        self.clock: pygame.time.Clock = pygame.time.Clock()
+        # Frame i is shown for 1000 / frame_data[i] ms; timeline holds when each frame ends within one loop
+        self.timeline: List[float] = list(
+            accumulate(1000 / self.frame_data[frame % len(self.frame_data)] for frame in range(self.frame_count))
+        )
+        self.elapsed: float = 0.0
+        self.time_scale: float = 1.0
 
         self.animating: bool = False
-        self.animation_thread: Thread = None
 
     @property
     def surface(self) -> pygame.Surface:
         """
         Returns the current frame
         """
-        return self.sprites[self.current_frame]
+        return self.transformed(self.frame(self.current_frame))
+
+    @property
+    def source_surface(self) -> pygame.Surface:
+        """
+        Returns the current frame, untransformed
+        """
+        return self.frame(self.current_frame)
+
+    def frame(self, index: int) -> pygame.Surface:
+        """
+        Returns the surface of a frame, warming it up first if it is compressed
+        """
+        if self.compressed:
+            return FramePool.get_instance().surface(self.sprites[index])
+        return self.sprites[index]
+
+    @property
+    def trim(self) -> Trim:
+        """
+        Returns the current frame's trim
+        """
+        if self.trims is None:
+            return None
+        return self.trims[self.current_frame]
 
     def start_animation(self) -> None:
         """
-        Starts the animation
+        Starts (or resumes) the animation
         """
         if not self.animating:
             self.animating = True
-            self.animation_thread = Thread(target=self.__run_animation, name=f"AnimatedSprite_{__name__}", args=())
-            self.animation_thread.start()
+            AnimationScheduler.get_instance().register(self)
 
     def stop_animation(self) -> None:
         """
-        Stops the animation
+        Stops the animation, holding the current frame
         """
         self.animating = False
-        self.animation_thread = None
+        AnimationScheduler.get_instance().unregister(self)
 
-    def __run_animation(self) -> None:
+    def advance(self, milliseconds: float) -> None:
         """
-        Thread which runs the animation
+        Advances the animation, called by the animation scheduler
+
+        :param milliseconds: The elapsed time, before this sprite's time scale is applied
+        """
+        self.seek(self.elapsed + milliseconds * self.time_scale)
+
+    def seek(self, milliseconds: float) -> None:
+        """
+        Jumps to a point in the animation
+
+        :param milliseconds: The time since the start of the animation
         """
-        while self.animating:
-            self.current_frame = (self.current_frame + 1) % self.frame_count
-            self.clock.tick(self.frame_data[self.current_frame % len(self.frame_data)])  # Wait for our framedata spec
+        self.elapsed = milliseconds % self.timeline[-1]
+        self.current_frame = bisect_right(self.timeline, self.elapsed)
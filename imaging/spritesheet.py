@@ -1,9 +1,78 @@
+import glob
+import io
 import logging
+import os
 import pygame
 import numpy as np
 
-from enum import Enum
-from typing import List
+from imaging.dedup import FrameDeduplicator
+from imaging.manifest import SliceManifest
+from interface import Trim
+
+from typing import Iterator, List, Tuple
+
+
+class SlicedSheet:
+    """
+    SlicedSheet holds the frames of a spritesheet as subsurface views which share the sheet's pixels
+
+    No pixels are copied while slicing, and every frame stays within the sheet's single buffer. Drawing on a
+    frame draws on the sheet.
+    """
+
+    def __init__(self, surface: pygame.Surface, rects: List[List[pygame.Rect]], trims: List[List[Trim]] = None):
+        """
+        Creates a sliced sheet
+
+        :param surface: The spritesheet surface
+        :param rects: The rects of each frame within the sheet, as an array of rows/columns
+        :param trims: How each frame's rect was trimmed from its full frame, if it was
+        """
+        self.surface: pygame.Surface = surface
+        self.rects: List[List[pygame.Rect]] = rects
+        self.trims: List[List[Trim]] = trims
+        self.frames: List[List[pygame.Surface]] = [[surface.subsurface(rect) for rect in row] for row in rects]
+
+    def trimmed(self) -> "SlicedSheet":
+        """
+        Returns a sheet whose frame views are cropped to their opaque bounding boxes; no pixels are copied
+        """
+        rects: List[List[pygame.Rect]] = []
+        trims: List[List[Trim]] = []
+        for (row_index, (row, frame_row)) in enumerate(zip(self.rects, self.frames)):
+            rects.append([])
+            trims.append([])
+            for (column_index, (rect, frame)) in enumerate(zip(row, frame_row)):
+                previous = Trim(0, 0, rect.width, rect.height)
+                if self.trims is not None:
+                    previous = self.trims[row_index][column_index]
+
+                bounds = frame.get_bounding_rect()
+                rects[-1].append(bounds.move(rect.topleft))
+                trims[-1].append(Trim(previous.x + bounds.x, previous.y + bounds.y, previous.width, previous.height))
+
+        return SlicedSheet(self.surface, rects, trims)
+
+    def frame(self, row: int, column: int) -> pygame.Surface:
+        """
+        Returns the frame at a row and column
+        """
+        return self.frames[row][column]
+
+    def row(self, row: int) -> List[pygame.Surface]:
+        """
+        Returns every frame of a row, i.e. for an AnimatedSprite
+        """
+        return self.frames[row]
+
+    def __getitem__(self, row: int) -> List[pygame.Surface]:
+        return self.frames[row]
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def __iter__(self) -> Iterator[List[pygame.Surface]]:
+        return iter(self.frames)
 
 
 class Spritesheet:
@@ -17,31 +86,321 @@ class Spritesheet:
     BREAK_COEFFICIENT_SOLID: int = 255
 
     @staticmethod
-    def fully_slice_file(filename: str, break_coefficient: int) -> List[List[pygame.Surface]]:
+    def fully_slice_file(
+        filename: str, break_coefficient: int, manifest: bool = False, deduplicator: FrameDeduplicator = None
+    ) -> List[List[pygame.Surface]]:
         """
         Fully slice surface by filename into an array of rows/columns
 
         :param filename: The filename to load
         :param break_coefficient: The break coefficient for slicing
+        :param manifest: Reuse (or create) the frame rects stored in the file's slice manifest
+        :param deduplicator: Share one surface between frames with identical pixels
+        """
+        (surface, rects) = Spritesheet.load_file(filename, break_coefficient, manifest)
+        return Spritesheet.copy_frames(surface, rects, deduplicator)
+
+    @staticmethod
+    def slice_sheet_file(filename: str, break_coefficient: int, manifest: bool = False) -> SlicedSheet:
+        """
+        Slice surface by filename into frame views which share the loaded sheet's pixels
+
+        :param filename: The filename to load
+        :param break_coefficient: The break coefficient for slicing
+        :param manifest: Reuse (or create) the frame rects stored in the file's slice manifest
         """
-        surface = pygame.image.load(filename)
-        return Spritesheet.fully_slice(surface, break_coefficient)
+        return SlicedSheet(*Spritesheet.load_file(filename, break_coefficient, manifest))
 
     @staticmethod
-    def fully_slice(surface: pygame.Surface, break_coefficient: int) -> List[List[pygame.Surface]]:
+    def load_file(
+        filename: str, break_coefficient: int, manifest: bool = False
+    ) -> Tuple[pygame.Surface, List[List[pygame.Rect]]]:
+        """
+        Loads a spritesheet file and finds its frame rects
+
+        With a manifest whose hash matches the file, loading costs one image decode; the alpha is not scanned
+
+        :param filename: The filename to load
+        :param break_coefficient: The break coefficient for slicing
+        :param manifest: Reuse (or create) the frame rects stored in the file's slice manifest
+        """
+        if not manifest:
+            surface = pygame.image.load(filename)
+            return (surface, Spritesheet.frame_rects(surface, break_coefficient))
+
+        with open(filename, "rb") as sheet_file:
+            contents = sheet_file.read()
+        surface = pygame.image.load(io.BytesIO(contents), filename)
+
+        sidecar = SliceManifest(filename)
+        digest = SliceManifest.digest(contents)
+        rects = sidecar.lookup(digest, break_coefficient)
+        if rects is None:
+            rects = Spritesheet.frame_rects(surface, break_coefficient)
+            sidecar.store(digest, break_coefficient, rects)
+
+        return (surface, rects)
+
+    @staticmethod
+    def generate_manifests(directory: str, break_coefficient: int, pattern: str = "**/*.png") -> int:
+        """
+        Pre-generates slice manifests for every matching spritesheet in a directory, returning how many were sliced
+
+        Sheets whose manifest is already up to date are skipped, as are images without per-pixel alpha (which are
+        not spritesheets) and files which fail to load or slice; those are logged rather than aborting the run
+
+        :param directory: The asset directory to search
+        :param break_coefficient: The break coefficient for slicing
+        :param pattern: The glob pattern of spritesheet files, relative to the directory
+        """
+        logger = logging.getLogger(__name__)
+        sliced = 0
+
+        for filename in sorted(glob.glob(os.path.join(directory, pattern), recursive=True)):
+            with open(filename, "rb") as sheet_file:
+                contents = sheet_file.read()
+
+            sidecar = SliceManifest(filename)
+            digest = SliceManifest.digest(contents)
+            if sidecar.lookup(digest, break_coefficient) is not None:
+                continue
+
+            try:
+                surface = pygame.image.load(io.BytesIO(contents), filename)
+                if not surface.get_flags() & pygame.SRCALPHA:
+                    logger.info(f"Skipping {filename}, which has no alpha channel to slice by")
+                    continue
+                rects = Spritesheet.frame_rects(surface, break_coefficient)
+            except (pygame.error, ValueError) as error:
+                logger.warning(f"Could not slice {filename}, skipping: {error}")
+                continue
+
+            sidecar.store(digest, break_coefficient, rects)
+            logger.info(f"Generated slice manifest for {filename}")
+            sliced = sliced + 1
+
+        return sliced
+
+    @staticmethod
+    def slice_sheet(surface: pygame.Surface, break_coefficient: int) -> SlicedSheet:
+        """
+        Slice a surface into frame views which share its pixels, rather than copying each frame
+
+        :param surface: The surface to slice
+        :param break_coefficient: The break coefficient for slicing
+        """
+        return SlicedSheet(surface, Spritesheet.frame_rects(surface, break_coefficient))
+
+    @staticmethod
+    def fully_slice(
+        surface: pygame.Surface, break_coefficient: int, deduplicator: FrameDeduplicator = None
+    ) -> List[List[pygame.Surface]]:
         """
         Fully slice a surface into an array of rows/columns
 
         :param surface: The surface to slice
         :param break_coefficient: The break coefficient for slicing
+        :param deduplicator: Share one surface between frames with identical pixels
         """
-        sliced_sheet: List[List[pygame.Surface]] = []
-        rows: List[pygame.Surface] = Spritesheet.slice_rows(surface, break_coefficient)
+        return Spritesheet.copy_frames(surface, Spritesheet.frame_rects(surface, break_coefficient), deduplicator)
 
-        for row in rows:
-            sliced_sheet.append(Spritesheet.slice_columns(row, break_coefficient))
+    @staticmethod
+    def fully_slice_grid(
+        surface: pygame.Surface, cell_size: Tuple[int, int], margin: int = 0, spacing: int = 0
+    ) -> List[List[pygame.Surface]]:
+        """
+        Fully slice a uniform grid sheet into an array of rows/columns, skipping fully transparent cells
 
-        return sliced_sheet
+        :param surface: The surface to slice
+        :param cell_size: The (width, height) of each cell
+        :param margin: The number of pixels around the outside of the grid
+        :param spacing: The number of pixels between neighbouring cells
+        """
+        return Spritesheet.copy_frames(surface, Spritesheet.grid_rects(surface, cell_size, margin, spacing))
+
+    @staticmethod
+    def fully_slice_components(surface: pygame.Surface, threshold: int = 0) -> List[List[pygame.Surface]]:
+        """
+        Fully slice an irregularly packed sheet into an array of rows/columns of its opaque blobs
+
+        :param surface: The surface to slice
+        :param threshold: Pixels with an alpha above this are considered opaque
+        """
+        return Spritesheet.copy_frames(surface, Spritesheet.component_rects(surface, threshold))
+
+    @staticmethod
+    def copy_frames(
+        surface: pygame.Surface, rects: List[List[pygame.Rect]], deduplicator: FrameDeduplicator = None
+    ) -> List[List[pygame.Surface]]:
+        """
+        Copies each frame rect of a surface into its own surface
+
+        :param surface: The surface to copy from
+        :param rects: The rects of each frame, as an array of rows/columns
+        :param deduplicator: Share one surface between frames with identical pixels
+        """
+        frames = [[surface.subsurface(rect).copy() for rect in row] for row in rects]
+        if deduplicator is not None:
+            frames = deduplicator.dedupe_sheet(frames)
+        return frames
+
+    @staticmethod
+    def trim(surface: pygame.Surface) -> Tuple[pygame.Surface, Trim]:
+        """
+        Crops a frame to its opaque bounding box, returning the cropped copy and how it was trimmed
+
+        Give the trim to the Sprite (or AnimatedSprite) using the frame so it is placed exactly as before
+        """
+        bounds = surface.get_bounding_rect()
+        return (surface.subsurface(bounds).copy(), Trim(bounds.x, bounds.y, surface.get_width(), surface.get_height()))
+
+    @staticmethod
+    def trim_frames(sheet: List[List[pygame.Surface]]) -> Tuple[List[List[pygame.Surface]], List[List[Trim]]]:
+        """
+        Crops every frame of a fully sliced sheet, returning the cropped frames and their trims in the same layout
+        """
+        trimmed = [[Spritesheet.trim(frame) for frame in row] for row in sheet]
+        return ([[frame for (frame, _) in row] for row in trimmed], [[trim for (_, trim) in row] for row in trimmed])
+
+    @staticmethod
+    def grid_rects(
+        surface: pygame.Surface, cell_size: Tuple[int, int], margin: int = 0, spacing: int = 0
+    ) -> List[List[pygame.Rect]]:
+        """
+        Finds the rects of every non-empty cell of a uniform grid, as an array of rows/columns
+
+        Cell positions are plain index arithmetic; the alpha (or colorkey) is only checked once to skip empty cells.
+        Every cell of a surface with neither is kept.
+
+        :param surface: The surface to slice
+        :param cell_size: The (width, height) of each cell
+        :param margin: The number of pixels around the outside of the grid
+        :param spacing: The number of pixels between neighbouring cells
+        """
+        (cell_width, cell_height) = cell_size
+        if cell_width <= 0 or cell_height <= 0:
+            raise ValueError(f"Grid cells must have a positive width and height, got {cell_size}")
+        if margin < 0 or spacing < 0:
+            raise ValueError(f"Grid margin and spacing must not be negative, got {margin} and {spacing}")
+
+        (width, height) = surface.get_size()
+        (stride_x, stride_y) = (cell_width + spacing, cell_height + spacing)
+        columns = max(0, (width - 2 * margin + spacing) // stride_x)
+        rows = max(0, (height - 2 * margin + spacing) // stride_y)
+
+        if surface.get_flags() & pygame.SRCALPHA:
+            solid = pygame.surfarray.pixels_alpha(surface)
+        elif surface.get_colorkey() is not None:
+            solid = pygame.surfarray.array_colorkey(surface)
+        else:
+            solid = None
+
+        if solid is None:
+            occupied = np.ones((columns, rows), dtype=bool)
+        else:
+            # Lay the grid's alpha out as (column, x, row, y) so each cell can be checked in one reduction
+            grid = np.zeros((columns * stride_x, rows * stride_y), dtype=bool)
+            grid_view = solid[margin : margin + grid.shape[0], margin : margin + grid.shape[1]]
+            grid[: grid_view.shape[0], : grid_view.shape[1]] = grid_view != 0
+            del grid_view, solid  # Unlock the surface by removing the references to its alpha
+
+            cells = grid.reshape(columns, stride_x, rows, stride_y)[:, :cell_width, :, :cell_height]
+            occupied = cells.any(axis=(1, 3))
+
+        sheet_rects: List[List[pygame.Rect]] = []
+        for row in range(0, rows):
+            row_rects = [
+                pygame.Rect(margin + column * stride_x, margin + row * stride_y, cell_width, cell_height)
+                for column in np.flatnonzero(occupied[:, row]).tolist()
+            ]
+            if row_rects:
+                sheet_rects.append(row_rects)
+
+        return sheet_rects
+
+    @staticmethod
+    def component_rects(surface: pygame.Surface, threshold: int = 0) -> List[List[pygame.Rect]]:
+        """
+        Finds the bounding rects of every connected opaque blob, grouped into rows of vertically overlapping blobs
+
+        Blobs are labelled in one pass over the alpha channel by pygame's mask module
+
+        :param surface: The surface to slice
+        :param threshold: Pixels with an alpha above this are considered opaque
+        """
+        rects = pygame.mask.from_surface(surface, threshold).get_bounding_rects()
+
+        sheet_rects: List[List[pygame.Rect]] = []
+        row_bottom = None
+        for rect in sorted(rects, key=lambda rect: (rect.top, rect.left)):
+            if row_bottom is None or rect.top >= row_bottom:
+                sheet_rects.append([])
+                row_bottom = rect.bottom
+            sheet_rects[-1].append(rect)
+            row_bottom = max(row_bottom, rect.bottom)
+
+        return [sorted(row, key=lambda rect: rect.left) for row in sheet_rects]
+
+    @staticmethod
+    def frame_rects(surface: pygame.Surface, break_coefficient: int) -> List[List[pygame.Rect]]:
+        """
+        Finds the rects of every frame of a surface, as an array of rows/columns
+
+        The alpha channel is only scanned once, through a referenced view
+
+        :param surface: The surface to slice
+        :param break_coefficient: The break coefficient for slicing
+        """
+        alphas = pygame.surfarray.pixels_alpha(surface)
+
+        sheet_rects: List[List[pygame.Rect]] = []
+        for (row_start, row_end) in Spritesheet.find_regions(alphas, break_coefficient):
+            row_alphas = alphas[:, row_start:row_end]
+            sheet_rects.append(
+                [
+                    pygame.Rect(column_start, row_start, column_end - column_start, row_end - row_start)
+                    for (column_start, column_end) in Spritesheet.find_regions(row_alphas, break_coefficient, True)
+                ]
+            )
+
+        del alphas  # Unlock the surface by removing the reference to alphas
+        return sheet_rects
+
+    @staticmethod
+    def find_regions(alphas: np.ndarray, break_coefficient: int, by_cols: bool = False) -> List[Tuple[int, int]]:
+        """
+        Finds the [start, end) line ranges between break lines, skipping fully transparent ranges
+
+        Break lines are found with a single vectorized reduction rather than a scan over each line. Region bounds
+        match those historically produced by slice_by: every region after the first begins on the break line
+        that precedes it, and a region running to the last line includes that line.
+
+        :param alphas: The (width, height) alpha array to scan
+        :param break_coefficient: The break coefficient for slicing
+        :param by_cols: Find column regions instead of row regions
+        """
+        axis = 1 if by_cols else 0  # Reduce across each line
+        breaks = np.all(alphas == break_coefficient, axis=axis)
+        if breaks.size == 0:
+            return []
+        breaks[-1] = True  # The last line always closes a region
+
+        # Break lines running unbroken from the first line begin no region
+        events = np.flatnonzero(breaks)
+        gaps = np.flatnonzero(events != np.arange(events.size))
+        if gaps.size == 0:
+            return []
+        first = gaps[0]
+
+        starts = np.concatenate(([first], events[first:-1]))
+        ends = events[first:].copy()
+        ends[-1] = breaks.size
+
+        # Drop regions which contain no visible pixels
+        visible_lines = np.concatenate(([0], np.cumsum(np.any(alphas != 0, axis=axis))))
+        visible = visible_lines[ends] > visible_lines[starts]
+
+        return list(zip(starts[visible].tolist(), ends[visible].tolist()))
 
     @staticmethod
     def slice_by(surface: pygame.Surface, break_coefficient: int, by_cols: bool = False) -> List[pygame.Surface]:
@@ -61,70 +420,18 @@ class Spritesheet:
 
         # Get the alpha of the spritesheet
         alphas = pygame.surfarray.pixels_alpha(surface)
-        pixels = pygame.surfarray.array3d(surface)
+        regions = Spritesheet.find_regions(alphas, break_coefficient, by_cols)
+        del alphas  # Unlock the surface by removing the reference to alphas
 
+        (width, height) = surface.get_size()
         slices: List[pygame.Surface] = []
-
-        region_start: int = 0  # Where the region begins
-        region_end: int = None
-
-        shape = alphas.shape[1]
-        if by_cols:
-            shape = alphas.shape[0]
-
-        for i in range(0, shape):
-            subarray = None
+        for (region_start, region_end) in regions:
+            logger.debug(f"Slicing region ({directionality}): [{region_start}, {region_end})")
             if by_cols:
-                subarray = alphas[i]
+                rect = pygame.Rect(region_start, 0, region_end - region_start, height)
             else:
-                subarray = alphas[..., i]
-
-            row_alpha: int = np.sum(subarray)
-            target_alpha: int = subarray.shape[0] * break_coefficient
-
-            if row_alpha == target_alpha or i == (shape - 1):
-                # We are on a "break line" or the last line
-                if region_start == i:
-                    # We've only moved 1 line down, i.e. in a "break block"
-                    region_start = i + 1  # Our image begins on the NEXT line
-                else:
-                    # We're on a line >1 away from our region start, so our intervening lines are our image
-                    region_end = i  # We do not subtract 1 here because numpy slices are non-inclusive on the end
-
-                    if region_end == (shape - 1):
-                        # We've hit the end of the file, so to include the last line we bump up
-                        region_end = shape
-
-                if region_end is not None:
-                    # We've identified a start and end region
-                    logger.debug(f"Slicing region ({directionality}): [{region_start}, {region_end})")
-                    new_alphas = None
-                    if by_cols:
-                        new_alphas = alphas[region_start:region_end]
-                    else:
-                        new_alphas = alphas[:, region_start:region_end]
-
-                    # Check they're not all transparent
-                    if np.sum(new_alphas) == 0:  # pragma: no cover
-                        logger.debug(f"Region is empty, skipping...")
-                    else:
-                        new_pixels = None
-                        if by_cols:
-                            new_pixels = pixels[region_start:region_end]
-                        else:
-                            new_pixels = pixels[:, region_start:region_end]
-
-                        row_surface: pygame.Surface = pygame.Surface.convert_alpha(
-                            pygame.surfarray.make_surface(new_pixels)
-                        )
-                        surface_alpha_reference = pygame.surfarray.pixels_alpha(row_surface)
-                        np.copyto(surface_alpha_reference, new_alphas)
-                        del surface_alpha_reference  # Unlock the surface by removing the reference to alphas
-
-                        slices.append(row_surface)
-
-                    region_start = region_end
-                    region_end = None
+                rect = pygame.Rect(0, region_start, width, region_end - region_start)
+            slices.append(surface.subsurface(rect).copy())
 
         logger.info(f"Spritesheet sliced into {len(slices)} {directionality}")
         return slices
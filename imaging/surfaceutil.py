@@ -0,0 +1,112 @@
+"""
+Surface helpers shared by the imaging caches
+"""
+import hashlib
+import logging
+import pygame
+
+from collections import OrderedDict
+from threading import Lock
+
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+def surface_digest(surface: pygame.Surface) -> str:
+    """
+    Returns a hash of a surface's size and RGBA contents
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(surface.get_size()).encode("utf-8"))
+    digest.update(pygame.image.tostring(surface, "RGBA"))
+    return digest.hexdigest()
+
+
+def surface_bytes(surface: pygame.Surface) -> int:
+    """
+    Returns the number of bytes of pixel data held by a surface
+    """
+    return surface.get_pitch() * surface.get_height()
+
+
+class SurfaceLRU:
+    """
+    Least recently used store of surfaces, bounded by the number of bytes of pixel data held
+
+    Base of the in memory imaging caches, which look entries up with lookup and add them with store
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        :param max_bytes: The number of bytes of surface data which may be held before evicting entries
+        """
+        self.logger = logging.getLogger(__name__)
+        self.max_bytes: int = max_bytes
+        self.bytes_used: int = 0
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+        # Key -> (owner, surface); the owner is held with the entry, so an id used in the key can't be reused
+        self.entries: "OrderedDict[Hashable, Tuple[Any, pygame.Surface]]" = OrderedDict()
+        self.lock: Lock = Lock()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the counters
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "bytes": self.bytes_used,
+        }
+
+    def lookup(self, key: Hashable) -> Optional[pygame.Surface]:
+        """
+        Returns the surface stored for a key, marking it most recently used, or None (counting a miss)
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses = self.misses + 1
+                return None
+
+            self.hits = self.hits + 1
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def store(self, key: Hashable, surface: pygame.Surface, owner: Any = None) -> None:
+        """
+        Stores a surface, evicting the least recently used entries to stay within the byte budget
+
+        A key stored in the meantime (i.e. by another thread which missed at the same time) is kept as is
+
+        :param owner: An object to keep alive while the entry is stored
+        """
+        size = surface_bytes(surface)
+        if size > self.max_bytes:
+            self.logger.debug(f"Surface of {size} bytes exceeds the {type(self).__name__} budget, not storing it")
+            return
+
+        with self.lock:
+            if key in self.entries:
+                return
+
+            while self.entries and self.bytes_used + size > self.max_bytes:
+                (_, (_, evicted)) = self.entries.popitem(last=False)
+                self.bytes_used = self.bytes_used - surface_bytes(evicted)
+                self.evictions = self.evictions + 1
+
+            self.entries[key] = (owner, surface)
+            self.bytes_used = self.bytes_used + size
+
+    def clear(self) -> None:
+        """
+        Empties the store, leaving the counters intact
+        """
+        with self.lock:
+            self.entries.clear()
+            self.bytes_used = 0
@@ -0,0 +1,79 @@
+import pygame
+import pytest
+
+from imaging import TextureAtlas, AtlasFrame, Sprite, AnimatedSprite, Spritesheet
+
+
+class SimpleSprite(Sprite):
+    @property
+    def position(self):
+        return None
+
+
+class SimpleAnimatedSprite(AnimatedSprite):
+    @property
+    def position(self):
+        return None
+
+
+def make_surface(size, color):
+    surface = pygame.Surface(size, pygame.SRCALPHA)
+    surface.fill(color)
+    return surface
+
+
+def test_atlas_pack():
+    atlas = TextureAtlas(page_size=(16, 16), padding=1)
+    surfaces = [
+        make_surface((4, 3), (255, 0, 0, 255)),
+        make_surface((7, 7), (0, 255, 0, 128)),
+        make_surface((7, 5), (0, 0, 255, 255)),
+        make_surface((3, 3), (1, 2, 3, 4)),
+    ]
+
+    frames = atlas.pack(surfaces)
+
+    assert len(atlas.pages) == 1
+    for (surface, frame) in zip(surfaces, frames):
+        assert frame.page is atlas.pages[0]
+        assert frame.rect.size == surface.get_size()
+        assert frame.surface.get_parent() is frame.page
+        assert pygame.image.tostring(frame.surface, "RGBA") == pygame.image.tostring(surface, "RGBA")
+
+    # Padded rects never overlap
+    padded = [pygame.Rect(frame.rect.topleft, (frame.rect.width + 1, frame.rect.height + 1)) for frame in frames]
+    for (index, rect) in enumerate(padded):
+        assert rect.collidelist(padded[index + 1 :]) == -1
+
+    # Tallest first, bottom-left
+    assert frames[1].rect.topleft == (0, 0)
+    assert frames[2].rect.topleft == (8, 0)
+
+
+def test_atlas_pages():
+    atlas = TextureAtlas(page_size=(8, 8), padding=0)
+
+    frames = atlas.pack([make_surface((8, 5), (255, 0, 0, 255)) for _ in range(0, 3)])
+
+    assert len(atlas.pages) == 3
+    assert [frame.page for frame in frames] == atlas.pages
+
+    with pytest.raises(ValueError):
+        atlas.add(make_surface((9, 1), (0, 0, 0, 255)))
+
+
+def test_atlas_sheet_and_sprites():
+    atlas = TextureAtlas(page_size=(256, 256))
+    sheet = Spritesheet.fully_slice_file("assets/testing/img/test_sheet_pad.png", 0)
+
+    frames = atlas.pack_sheet(sheet)
+
+    assert [len(row) for row in frames] == [len(row) for row in sheet]
+    assert all(isinstance(frame, AtlasFrame) for row in frames for frame in row)
+
+    sprite = SimpleSprite(frames[0][0])
+    assert sprite.surface is frames[0][0].surface
+
+    animated = SimpleAnimatedSprite(frames[1])
+    assert animated.sprites == [frame.surface for frame in frames[1]]
+    assert AtlasFrame.resolve(sheet[0][0]) is sheet[0][0]
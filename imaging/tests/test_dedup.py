@@ -0,0 +1,54 @@
+import pygame
+
+from imaging import AssetPipeline, FrameDeduplicator, Spritesheet
+
+
+def make_surface(color, size=(4, 4)):
+    surface = pygame.Surface(size, pygame.SRCALPHA, 32)
+    surface.fill(color)
+    return surface
+
+
+def test_dedupe():
+    deduplicator = FrameDeduplicator()
+    first = make_surface((255, 0, 0, 255))
+    same = make_surface((255, 0, 0, 255))
+    other = make_surface((0, 255, 0, 255))
+    larger = make_surface((255, 0, 0, 255), (4, 8))
+
+    assert deduplicator.dedupe(first) is first
+    assert deduplicator.dedupe(same) is first
+    assert deduplicator.dedupe(other) is other
+    assert deduplicator.dedupe(larger) is larger
+    assert deduplicator.stats == {"unique": 3, "duplicates": 1, "bytes_saved": same.get_pitch() * 4}
+
+
+def test_dedupe_sheet():
+    deduplicator = FrameDeduplicator()
+    filename = "assets/testing/img/test_sheet_nopad.png"
+    coeff = Spritesheet.BREAK_COEFFICIENT_TRANSPARENT
+
+    first = Spritesheet.fully_slice_file(filename, coeff, deduplicator=deduplicator)
+    (unique, duplicates) = (deduplicator.stats["unique"], deduplicator.stats["duplicates"])
+    second = Spritesheet.fully_slice_file(filename, coeff, deduplicator=deduplicator)
+
+    assert [len(row) for row in second] == [len(row) for row in first]
+    for (row, first_row) in zip(second, first):
+        for (frame, first_frame) in zip(row, first_row):
+            assert frame is first_frame
+    assert deduplicator.stats["unique"] == unique
+    assert deduplicator.stats["duplicates"] == duplicates + sum(len(row) for row in first)
+    assert deduplicator.stats["bytes_saved"] > 0
+
+
+def test_pipeline_dedupe():
+    deduplicator = FrameDeduplicator()
+    pipeline = AssetPipeline(max_workers=2, deduplicator=deduplicator)
+    pipeline.submit("assets/testing/img/test_sheet_pad.png", Spritesheet.BREAK_COEFFICIENT_TRANSPARENT)
+    pipeline.submit("assets/testing/img/test_sheet_black_pad.png", Spritesheet.BREAK_COEFFICIENT_SOLID)
+
+    loaded = pipeline.load_all()
+    frames = [frame for sheet in loaded.values() for row in sheet for frame in row]
+
+    assert len({id(frame) for frame in frames}) == deduplicator.stats["unique"]
+    assert len(frames) == deduplicator.stats["unique"] + deduplicator.stats["duplicates"]
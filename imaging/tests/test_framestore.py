@@ -0,0 +1,63 @@
+import pygame
+import pytest
+
+from imaging import CompressedFrame, FramePool, Spritesheet
+
+
+@pytest.fixture
+def frames():
+    sheet = Spritesheet.fully_slice_file(
+        "assets/testing/img/sheet_robot.png", Spritesheet.BREAK_COEFFICIENT_TRANSPARENT
+    )
+    return sheet[0]
+
+
+def test_compressed_frame(frames):
+    frame = CompressedFrame.compress(frames[0], optimize=False)
+    surface = frame.decompress()
+
+    assert frame.size == frames[0].get_size()
+    assert len(frame.data) < frames[0].get_pitch() * frames[0].get_height()
+    assert pygame.image.tostring(surface, "RGBA") == pygame.image.tostring(frames[0], "RGBA")
+    assert CompressedFrame.compress(frames[0], optimize=False) is frame
+    assert CompressedFrame.compress(frames[0], optimize=True) is not frame
+
+
+def test_compressed_frame_optimize(frames):
+    pygame.display.set_mode((1, 1))
+    surface = CompressedFrame.compress(frames[0]).decompress()
+
+    assert not surface.get_flags() & pygame.SRCALPHA
+
+
+def test_frame_pool():
+    frames = [pygame.Surface((4, 4), pygame.SRCALPHA, 32) for _ in range(3)]
+    compressed = [CompressedFrame.compress(frame, optimize=False) for frame in frames]
+    frame_bytes = frames[0].get_pitch() * frames[0].get_height()
+    pool = FramePool(max_bytes=frame_bytes * 2)
+
+    first = pool.surface(compressed[0])
+    assert pool.surface(compressed[0]) is first
+    pool.surface(compressed[1])
+    pool.surface(compressed[2])
+
+    assert pool.stats == {"hits": 1, "misses": 3, "evictions": 1, "entries": 2, "bytes": frame_bytes * 2}
+    assert pool.surface(compressed[0]) is not first
+
+    pool.clear()
+    assert pool.stats["entries"] == 0
+    assert pool.stats["bytes"] == 0
+
+
+def test_frame_pool_oversized(frames):
+    pool = FramePool(max_bytes=1)
+    pool.surface(CompressedFrame.compress(frames[0], optimize=False))
+
+    assert pool.stats["entries"] == 0
+
+
+def test_frame_pool_singleton():
+    pool = FramePool.get_instance()
+
+    assert FramePool.get_instance() is pool
+    assert FramePool.get_instance(fresh=True) is not pool
@@ -0,0 +1,71 @@
+import pygame
+import pytest
+
+import numpy as np
+
+from imaging import IndexedSurface, Palette, KEY_HUES
+from imaging.palette import PaletteColor
+
+
+@pytest.fixture
+def image():
+    """
+    Image with two shades of the primary key hue, one secondary color, one grey and a transparent pixel
+    """
+    surface = pygame.Surface((5, 1), pygame.SRCALPHA)
+    surface.set_at((0, 0), PaletteColor(240).rgb)
+    surface.set_at((1, 0), PaletteColor(240, v=0.5).rgb)
+    surface.set_at((2, 0), PaletteColor(200).rgb)
+    surface.set_at((3, 0), (128, 128, 128, 255))
+    surface.set_at((4, 0), (0, 0, 255, 0))
+    return surface
+
+
+def colors(indexed: IndexedSurface):
+    return [tuple(indexed.surface.get_at((x, 0)))[:3] for x in range(0, 4)]
+
+
+def test_indexed_surface(image):
+    indexed = IndexedSurface(image)
+
+    assert indexed.surface.get_bitsize() == 8
+    assert indexed.bands[KEY_HUES.PRIMARY] == range(1, 3)
+    assert indexed.bands[KEY_HUES.SECONDARY] == range(3, 4)
+    assert len(indexed.bands[KEY_HUES.TERTIARY]) == 0
+
+    indices = pygame.surfarray.array2d(indexed.surface)[:, 0].tolist()
+    assert indices == [2, 1, 3, 4, IndexedSurface.TRANSPARENT_INDEX]
+    assert colors(indexed) == [tuple(image.get_at((x, 0)))[:3] for x in range(0, 4)]
+
+
+def test_indexed_surface_apply_palette(image):
+    indexed = IndexedSurface(image)
+    palette = Palette({240: 0, 200: 120})
+
+    indexed.apply_palette(palette)
+
+    expected = palette.convert_pixel_array(pygame.surfarray.array3d(image))[:4, 0].tolist()
+    assert colors(indexed) == [tuple(color) for color in expected]
+
+    indexed.reset()
+    assert colors(indexed) == [tuple(image.get_at((x, 0)))[:3] for x in range(0, 4)]
+
+    indexed.cycle([Palette({}), palette], 3)
+    assert colors(indexed) == [tuple(color) for color in expected]
+
+
+def test_indexed_surface_rotate_band(image):
+    indexed = IndexedSurface(image)
+    original = colors(indexed)
+
+    indexed.rotate_band(KEY_HUES.PRIMARY)
+
+    assert colors(indexed) == [original[1], original[0], original[2], original[3]]
+
+
+def test_indexed_surface_too_many_colors():
+    image = pygame.Surface((256, 1), pygame.SRCALPHA)
+    pygame.surfarray.blit_array(image, np.array([[[x, 0, 0]] for x in range(0, 256)]))
+
+    with pytest.raises(ValueError):
+        IndexedSurface(image)
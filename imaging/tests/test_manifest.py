@@ -0,0 +1,102 @@
+import logging
+import os
+import shutil
+
+import pygame
+import pytest
+
+from imaging import Spritesheet
+from imaging.manifest import SliceManifest
+
+
+@pytest.fixture
+def sheet_file(tmp_path):
+    """
+    A copy of a test spritesheet which may be freely modified
+    """
+    filename = str(tmp_path / "sheet.png")
+    shutil.copyfile("assets/testing/img/test_sheet_pad.png", filename)
+    return filename
+
+
+def test_manifest_created_and_reused(sheet_file, monkeypatch):
+    coeff = Spritesheet.BREAK_COEFFICIENT_TRANSPARENT
+
+    sliced = Spritesheet.fully_slice_file(sheet_file, coeff, manifest=True)
+
+    assert os.path.exists(f"{sheet_file}{SliceManifest.EXTENSION}")
+    assert [len(row) for row in sliced] == [2, 2]
+
+    # A warm manifest means the alpha is never scanned
+    def fail(*args):
+        raise AssertionError("Sheet was re-sliced")
+
+    monkeypatch.setattr(Spritesheet, "frame_rects", fail)
+    sheet = Spritesheet.slice_sheet_file(sheet_file, coeff, manifest=True)
+
+    assert [len(row) for row in sheet] == [2, 2]
+    for (row, copied_row) in zip(sheet, sliced):
+        for (frame, copied_frame) in zip(row, copied_row):
+            assert pygame.image.tostring(frame, "RGBA") == pygame.image.tostring(copied_frame, "RGBA")
+
+
+def test_manifest_invalidation(sheet_file):
+    transparent = Spritesheet.BREAK_COEFFICIENT_TRANSPARENT
+    solid = Spritesheet.BREAK_COEFFICIENT_SOLID
+
+    with open(sheet_file, "rb") as f:
+        digest = SliceManifest.digest(f.read())
+
+    manifest = SliceManifest(sheet_file)
+    assert manifest.lookup(digest, transparent) is None
+
+    manifest.store(digest, transparent, [[pygame.Rect(1, 2, 3, 4)]])
+    manifest.store(digest, solid, [])
+
+    assert manifest.lookup(digest, transparent) == [[pygame.Rect(1, 2, 3, 4)]]
+    assert manifest.lookup(digest, solid) == []
+    assert manifest.lookup("changed", transparent) is None
+
+    with open(manifest.path, "w") as f:
+        f.write("{not json")
+    assert manifest.lookup(digest, transparent) is None
+
+
+def test_generate_manifests(sheet_file, tmp_path):
+    os.makedirs(str(tmp_path / "nested"))
+    shutil.copyfile(sheet_file, str(tmp_path / "nested" / "other.png"))
+
+    assert Spritesheet.generate_manifests(str(tmp_path), Spritesheet.BREAK_COEFFICIENT_TRANSPARENT) == 2
+    assert os.path.exists(str(tmp_path / "nested" / f"other.png{SliceManifest.EXTENSION}"))
+    assert Spritesheet.generate_manifests(str(tmp_path), Spritesheet.BREAK_COEFFICIENT_TRANSPARENT) == 0
+
+
+def test_generate_manifests_skips_unsliceable(sheet_file, tmp_path, caplog):
+    caplog.set_level(logging.INFO)
+    # Sorted first, so a crash on these would stop the sheet after them from being sliced
+    shutil.copyfile("assets/testing/img/background.png", str(tmp_path / "a_background.png"))
+    with open(str(tmp_path / "a_broken.png"), "wb") as f:
+        f.write(b"not a png")
+
+    assert Spritesheet.generate_manifests(str(tmp_path), Spritesheet.BREAK_COEFFICIENT_TRANSPARENT) == 1
+    assert os.path.exists(f"{sheet_file}{SliceManifest.EXTENSION}")
+    assert not os.path.exists(str(tmp_path / f"a_background.png{SliceManifest.EXTENSION}"))
+    assert "no alpha channel" in caplog.text
+    assert "Could not slice" in caplog.text
+
+
+def test_manifest_store_failure(sheet_file, monkeypatch, caplog):
+    manifest = SliceManifest(sheet_file)
+    manifest.store("digest", Spritesheet.BREAK_COEFFICIENT_TRANSPARENT, [[pygame.Rect(1, 2, 3, 4)]])
+
+    def fail(*args):
+        raise OSError("disk full")
+
+    # A failed write is logged, and leaves the previous manifest and no temporary file behind
+    monkeypatch.setattr(os, "replace", fail)
+    manifest.store("digest", Spritesheet.BREAK_COEFFICIENT_SOLID, [])
+
+    assert "could not be written" in caplog.text
+    assert not os.path.exists(f"{manifest.path}.tmp")
+    assert manifest.lookup("digest", Spritesheet.BREAK_COEFFICIENT_TRANSPARENT) == [[pygame.Rect(1, 2, 3, 4)]]
+    assert manifest.lookup("digest", Spritesheet.BREAK_COEFFICIENT_SOLID) is None
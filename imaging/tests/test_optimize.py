@@ -0,0 +1,144 @@
+import pygame
+import pytest
+
+from imaging import Palette, Sprite, SurfaceOptimizer
+
+
+@pytest.fixture(autouse=True)
+def display():
+    pygame.display.set_mode((1, 1))
+
+
+def make_surface(alphas, color=(10, 20, 30)):
+    surface = pygame.Surface((len(alphas), 1), pygame.SRCALPHA, 32)
+    for (x, alpha) in enumerate(alphas):
+        surface.set_at((x, 0), (*color, alpha))
+    return surface
+
+
+def render(surface, flags=0):
+    screen = pygame.Surface(surface.get_size())
+    screen.fill((40, 80, 120))
+    screen.blit(surface, (0, 0), special_flags=flags)
+    return pygame.image.tostring(screen, "RGB")
+
+
+@pytest.mark.parametrize(
+    "alphas, mode", [([255, 255], SurfaceOptimizer.OPAQUE), ([0, 255], SurfaceOptimizer.BINARY), ([0, 128], "alpha")]
+)
+def test_alpha_mode(alphas, mode):
+    surface = make_surface(alphas)
+    optimized = SurfaceOptimizer.optimize(surface)
+
+    assert SurfaceOptimizer.alpha_mode(surface) == mode
+    assert render(optimized) == render(surface)
+    assert SurfaceOptimizer.optimize(surface) is optimized
+    assert SurfaceOptimizer.optimize(optimized) is optimized
+
+
+def test_optimize_opaque():
+    optimized = SurfaceOptimizer.optimize(make_surface([255, 255]))
+
+    assert not optimized.get_flags() & pygame.SRCALPHA
+    assert optimized.get_colorkey() is None
+
+
+def test_optimize_binary():
+    optimized = SurfaceOptimizer.optimize(make_surface([0, 255, 0]))
+
+    assert not optimized.get_flags() & pygame.SRCALPHA
+    assert optimized.get_flags() & pygame.RLEACCELOK
+    assert optimized.get_colorkey()[:3] == (255, 0, 255)
+
+
+def test_optimize_binary_colorkey_in_use():
+    surface = make_surface([0, 255, 255], (255, 0, 255))
+    surface.set_at((2, 0), (0, 0, 0, 255))
+    optimized = SurfaceOptimizer.optimize(surface)
+
+    assert optimized.get_colorkey()[:3] == (0, 0, 1)
+    assert render(optimized) == render(surface)
+
+
+def test_optimize_colorkey():
+    surface = pygame.Surface((2, 1))
+    surface.fill((1, 2, 3))
+    surface.set_at((0, 0), (9, 9, 9))
+    surface.set_colorkey((9, 9, 9))
+    optimized = SurfaceOptimizer.optimize(surface)
+
+    assert SurfaceOptimizer.alpha_mode(surface) == SurfaceOptimizer.BINARY
+    assert optimized.get_flags() & pygame.RLEACCELOK
+    assert render(optimized) == render(surface)
+
+
+def test_optimize_premultiplied():
+    surface = make_surface([0, 128])
+    optimized = SurfaceOptimizer.optimize(surface, premultiply=True)
+
+    assert optimized is not SurfaceOptimizer.optimize(surface)
+    assert optimized.get_at((1, 0))[:3] == (5, 10, 15)
+    assert render(optimized, pygame.BLEND_PREMULTIPLIED) == render(surface)
+
+
+def test_optimize_skipped():
+    sheet = make_surface([0, 255, 255, 255])
+    view = sheet.subsurface((1, 0, 2, 1))
+    indexed = pygame.Surface((2, 2), 0, 8)
+
+    assert SurfaceOptimizer.optimize(view) is view
+    assert SurfaceOptimizer.optimize(indexed) is indexed
+
+
+def test_paint_optimized_sprite():
+    class PaintedSprite(Sprite):
+        @property
+        def position(self):
+            return None
+
+    image = make_surface([0, 255, 255, 0], (0, 0, 255))
+    sprite = PaintedSprite(image)
+    assert sprite.surface.get_colorkey() is not None
+
+    palette = Palette({240: 0}, tolerance=0)
+    painted = palette.paint_image(sprite.surface)
+    assert palette.paint_image(sprite.surface, in_place=True) is sprite.surface
+
+    assert render(sprite.surface) == render(painted)
+    assert render(sprite.surface) == render(make_surface([0, 255, 255, 0], (255, 0, 0)))
+    assert [painted.get_at((x, 0)).a for x in range(4)] == [0, 255, 255, 0]
+    assert [surface.get_at((0, 0)).a for surface in palette.paint_many([sprite.surface])] == [0]
+
+
+def test_optimize_shares_by_source():
+    class PaintedSprite(Sprite):
+        @property
+        def position(self):
+            return None
+
+    # Identical art loaded twice must not share one surface, or painting one unit in place recolours the other
+    (first, second) = (
+        PaintedSprite(make_surface([0, 255], (0, 0, 255))),
+        PaintedSprite(make_surface([0, 255], (0, 0, 255))),
+    )
+    assert first.surface is not second.surface
+
+    Palette({240: 0}, tolerance=0).paint_image(first.surface, in_place=True)
+    assert first.surface.get_at((1, 0))[:3] == (255, 0, 0)
+    assert second.surface.get_at((1, 0))[:3] == (0, 0, 255)
+
+
+def test_optimize_cache_follows_contents():
+    source = make_surface([255, 255], (255, 0, 0))
+    optimized = SurfaceOptimizer.optimize(source)
+
+    assert SurfaceOptimizer.optimize(source) is optimized
+
+    # Painting the source in place must not hand back the stale optimized copy
+    Palette({0: 240}, tolerance=0).paint_image(source, in_place=True)
+    repainted = SurfaceOptimizer.optimize(source)
+    assert repainted.get_at((0, 0))[:3] == (0, 0, 255)
+
+    # Nor may painting a shared optimized surface leak into new sprites of the original contents
+    Palette({240: 120}, tolerance=0).paint_image(repainted, in_place=True)
+    assert SurfaceOptimizer.optimize(source).get_at((0, 0))[:3] == (0, 0, 255)
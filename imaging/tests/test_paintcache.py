@@ -0,0 +1,157 @@
+import os
+import pygame
+import pytest
+
+from imaging import PaintCache, DiskPaintCache, Palette
+
+
+@pytest.fixture
+def image():
+    """
+    Small transparent image with a single opaque blue pixel
+    """
+    pygame.display.set_mode((1, 1))
+    surface = pygame.Surface((4, 4), pygame.SRCALPHA)
+    surface.set_at((1, 1), (0, 0, 255, 255))
+    return surface
+
+
+def test_paint_cache_hit(image):
+    cache = PaintCache()
+
+    first = cache.paint_image(Palette({240: 0}), image)
+    second = cache.paint_image(Palette({240: 0}), image)
+
+    assert first is second
+    assert tuple(first.get_at((1, 1))) == (255, 0, 0, 255)
+    assert cache.stats == {"hits": 1, "misses": 1, "evictions": 0, "entries": 1, "bytes": 64}
+
+
+def test_paint_cache_keys(image):
+    cache = PaintCache()
+
+    first = cache.paint_image(Palette({240: 0}), image)
+    other_palette = cache.paint_image(Palette({240: 120}), image)
+
+    image.set_at((2, 2), (0, 0, 255, 255))
+    other_image = cache.paint_image(Palette({240: 0}), image)
+
+    assert first is not other_palette
+    assert first is not other_image
+    assert cache.misses == 3
+    assert cache.hits == 0
+
+
+def test_paint_cache_eviction(image):
+    cache = PaintCache(max_bytes=128)
+
+    first = cache.paint_image(Palette({240: 0}), image)
+    cache.paint_image(Palette({240: 60}), image)
+    cache.paint_image(Palette({240: 0}), image)  # Refresh first palette, making the second the oldest
+    cache.paint_image(Palette({240: 120}), image)
+
+    assert cache.evictions == 1
+    assert cache.bytes_used == 128
+    assert cache.paint_image(Palette({240: 0}), image) is first
+    assert cache.hits == 2
+
+
+def test_paint_cache_over_budget(image):
+    cache = PaintCache(max_bytes=10)
+
+    cache.paint_image(Palette({240: 0}), image)
+
+    assert cache.stats["entries"] == 0
+    assert cache.bytes_used == 0
+
+    cache = PaintCache()
+    cache.paint_image(Palette({240: 0}), image)
+    cache.clear()
+
+    assert cache.stats["entries"] == 0
+    assert cache.misses == 1
+
+
+def test_palette_digest():
+    assert Palette({240: 0}).digest == Palette({240: 0}).digest
+    assert Palette({240: 0}).digest != Palette({240: 0}, tolerance=0).digest
+    assert Palette({240: 0}).digest != Palette({240: 0}, colors={(0, 0, 0): (1, 1, 1)}).digest
+
+
+@pytest.fixture
+def image_file(image, tmp_path):
+    """
+    The small image fixture saved as a png
+    """
+    filename = str(tmp_path / "image.png")
+    pygame.image.save(image, filename)
+    return filename
+
+
+def test_disk_paint_cache(image_file, tmp_path):
+    directory = str(tmp_path / "cache")
+
+    cache = DiskPaintCache(directory)
+    painted = cache.paint_file(Palette({240: 0}), image_file)
+
+    assert cache.stats == {"hits": 0, "misses": 1, "evictions": 0}
+    assert len(cache.entries()) == 1
+
+    # A fresh cache (i.e. the next launch) loads the stored paint instead of painting
+    cache = DiskPaintCache(directory)
+    loaded = cache.paint_file(Palette({240: 0}), image_file)
+
+    assert cache.stats == {"hits": 1, "misses": 0, "evictions": 0}
+    assert loaded.get_size() == (4, 4)
+    assert tuple(loaded.get_at((1, 1))) == (255, 0, 0, 255)
+    assert tuple(loaded.get_at((0, 0)))[3] == 0
+    assert pygame.image.tostring(loaded, "RGBA") == pygame.image.tostring(painted, "RGBA")
+    # Hits come back in the same (display) format as misses
+    assert (loaded.get_bitsize(), loaded.get_masks()) == (painted.get_bitsize(), painted.get_masks())
+    assert loaded.get_flags() & pygame.SRCALPHA
+
+    # Drawing on a loaded surface must not write through to the cache
+    loaded.fill((1, 2, 3, 4))
+    assert tuple(cache.paint_file(Palette({240: 0}), image_file).get_at((1, 1))) == (255, 0, 0, 255)
+
+
+def test_disk_paint_cache_invalidation(image, image_file, tmp_path):
+    directory = str(tmp_path / "cache")
+
+    cache = DiskPaintCache(directory)
+    cache.paint_file(Palette({240: 0}), image_file)
+    cache.paint_file(Palette({240: 120}), image_file)
+    assert len(cache.entries()) == 2
+
+    # Changing the file replaces its entry for that palette
+    image.set_at((2, 2), (0, 0, 255, 255))
+    pygame.image.save(image, image_file)
+    repainted = cache.paint_file(Palette({240: 0}), image_file)
+    cache.paint_file(Palette({240: 120}), image_file)
+
+    assert cache.misses == 4
+    assert len(cache.entries()) == 2
+    assert tuple(repainted.get_at((2, 2))) == (255, 0, 0, 255)
+
+    # Entries from another engine version are removed on start up
+    stale = cache.entries()[0].replace(f"{directory}/{Palette.ENGINE_VERSION}-", f"{directory}/0-")
+    os.rename(cache.entries()[0], stale)
+    cache = DiskPaintCache(directory)
+    assert len(cache.entries()) == 1
+
+    # Unreadable entries are repainted
+    with open(cache.entries()[0], "wb") as entry:
+        entry.write(b"garbage")
+    for palette in [Palette({240: 0}), Palette({240: 120})]:
+        cache.paint_file(palette, image_file)
+    assert cache.misses == 2
+
+
+def test_disk_paint_cache_budget(image_file, tmp_path):
+    cache = DiskPaintCache(str(tmp_path / "cache"), max_bytes=300)
+
+    cache.paint_file(Palette({240: 0}), image_file)
+    cache.paint_file(Palette({240: 120}), image_file)
+
+    assert cache.evictions == 1
+    assert len(cache.entries()) == 1
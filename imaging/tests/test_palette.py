@@ -1,3 +1,4 @@
+import os
 import pygame
 import pytest
 
@@ -90,3 +91,209 @@ def test_paint_image(pixel_values: np.ndarray):
     new_pixel_values = pygame.surfarray.array3d(surf)
 
     assert np.array_equal(new_pixel_values, expected)
+
+
+@pytest.mark.parametrize("tolerance", [0, 3, 40])
+def test_convert_pixel_array_matches_convert_pixel(tolerance: int):
+    """
+    Test the vectorized conversion gives identical results to the per-pixel conversion
+    """
+    palette = Palette({240: 0, 200: 64, 160: 44, 100: 305, 0: 359}, tolerance=tolerance)
+
+    pixels = np.random.RandomState(0).randint(0, 256, (64, 64, 3)).astype(np.uint8)
+    pixels[0, 0:3] = [[0, 0, 0], [255, 255, 255], [128, 128, 128]]
+
+    expected = np.array([[palette.convert_pixel(color) for color in column] for column in pixels])
+
+    assert np.array_equal(palette.convert_pixel_array(pixels), expected)
+
+
+def test_convert_pixel_array_skips_transparent(pixel_values: np.ndarray):
+    """
+    Test fully transparent pixels are left untouched when alphas are supplied
+    """
+    palette = Palette({240: 0, 200: 120, 160: 240, 100: 180}, tolerance=0)
+
+    alphas = np.array([[255, 0, 1, 0, 255]])
+    expected = np.array([[[255, 0, 0], pixel_values[0, 1], [0, 0, 255], pixel_values[0, 3], [0, 0, 0]]])
+
+    new_pixel_values = palette.convert_pixel_array(pixel_values, alphas)
+
+    assert np.array_equal(new_pixel_values, expected)
+
+
+def test_hue_table():
+    """
+    Test the dense hue lookup table
+    """
+    palette = Palette({240: 0}, tolerance=1)
+    table = palette.hue_table()
+
+    assert table.shape == (361,)
+    assert table[240] == 0
+    assert table[241] == 1 / 360.0
+    assert table[239] == 359 / 360.0
+    assert table[100] == 100 / 360.0
+
+
+def test_convert_pixel_array_unique_colors():
+    """
+    Test the unique color mode gives the same results as converting every pixel
+    """
+    palette = Palette({240: 0, 200: 64, 160: 44, 100: 305})
+
+    colors = np.random.RandomState(1).randint(0, 256, (12, 3))
+    pixels = colors[np.random.RandomState(2).randint(0, 12, (32, 32))].astype(np.uint8)
+    alphas = np.random.RandomState(3).randint(0, 2, (32, 32)) * 255
+
+    expected = palette.convert_pixel_array(pixels, alphas)
+
+    assert np.array_equal(palette.convert_pixel_array(pixels, alphas, unique_colors=True), expected)
+    assert np.array_equal(palette.convert_pixel_array(pixels, np.zeros((32, 32)), unique_colors=True), pixels)
+
+
+@pytest.mark.parametrize("unique_colors", [False, True])
+def test_convert_pixel_array_exact_colors(pixel_values: np.ndarray, unique_colors: bool):
+    """
+    Test exact RGB mappings take precedence over hue mappings
+    """
+    palette = Palette(
+        {240: 0, 200: 120}, tolerance=0, colors={(0, 0, 0): (1, 2, 3), tuple(pixel_values[0, 0]): (4, 5, 6)}
+    )
+
+    expected = np.array([[[4, 5, 6], [0, 255, 0], pixel_values[0, 2], pixel_values[0, 3], [1, 2, 3]]])
+
+    assert np.array_equal(palette.convert_pixel_array(pixel_values, unique_colors=unique_colors), expected)
+    assert palette.convert_pixel((0, 0, 0)) == (1, 2, 3)
+
+
+@pytest.mark.parametrize("unique_colors", [False, True])
+def test_paint_many(unique_colors: bool):
+    """
+    Test painting many mixed size images at once matches painting them one by one
+    """
+    palette = Palette({240: 0, 200: 120})
+
+    pygame.display.set_mode((1, 1))
+
+    images = []
+    for (index, size) in enumerate([(3, 2), (3, 2), (5, 4)]):
+        image = pygame.Surface(size, pygame.SRCALPHA)
+        image.fill((0, 0, 255, 255))
+        image.set_at((0, 0), (0, 170, 255, 128))
+        image.set_at((1, 1), (index, 0, 0, 0))
+        images.append(image)
+
+    painted = palette.paint_many(images, unique_colors)
+
+    assert len(painted) == 3
+    for (image, surface) in zip(images, painted):
+        expected = palette.paint_image(image)
+        assert surface.get_size() == image.get_size()
+        assert np.array_equal(pygame.surfarray.array3d(surface), pygame.surfarray.array3d(expected))
+        assert np.array_equal(pygame.surfarray.array_alpha(surface), pygame.surfarray.array_alpha(image))
+
+    assert palette.paint_many([]) == []
+
+    sheet = palette.paint_sheet([images[:2], [], images[2:]])
+    assert [len(row) for row in sheet] == [2, 0, 1]
+    assert sheet[0][0].get_at((2, 1)) == pygame.Color(255, 0, 0, 255)
+
+
+def test_paint_image_in_place():
+    """
+    Test painting an image's own pixels, leaving its alpha untouched
+    """
+    palette = Palette({240: 0}, tolerance=0)
+
+    image = pygame.Surface((3, 2), pygame.SRCALPHA)
+    image.fill((0, 0, 255, 200))
+    image.set_at((0, 0), (0, 0, 255, 0))
+
+    assert palette.paint_image(image, in_place=True) is image
+    assert image.get_at((1, 1)) == pygame.Color(255, 0, 0, 200)
+    assert image.get_at((0, 0)) == pygame.Color(0, 0, 255, 0)
+
+    opaque = pygame.Surface((2, 2))
+    opaque.fill((0, 0, 255))
+    palette.paint_image(opaque, in_place=True)
+    assert opaque.get_at((1, 1)) == pygame.Color(255, 0, 0, 255)
+
+
+def test_paint_image_destination():
+    """
+    Test painting into an existing destination surface
+    """
+    palette = Palette({240: 0}, tolerance=0)
+
+    image = pygame.Surface((3, 2), pygame.SRCALPHA)
+    image.fill((0, 0, 255, 255))
+    image.set_at((0, 0), (0, 0, 255, 0))
+
+    destination = image.copy()
+    destination.fill((9, 9, 9, 100))
+
+    assert palette.paint_image(image, destination=destination) is destination
+    assert destination.get_at((1, 1)) == pygame.Color(255, 0, 0, 100)
+    assert destination.get_at((0, 0)) == pygame.Color(0, 0, 255, 100)
+    assert image.get_at((1, 1)) == pygame.Color(0, 0, 255, 255)
+
+    with pytest.raises(ValueError):
+        palette.paint_image(image, destination=pygame.Surface((1, 1)))
+
+
+def test_paint_variants():
+    """
+    Test painting variants across a process pool matches painting each palette directly
+    """
+    pygame.display.set_mode((1, 1))
+
+    image = pygame.Surface((4, 3), pygame.SRCALPHA)
+    image.fill((0, 0, 255, 255))
+    image.set_at((0, 0), (0, 170, 255, 10))
+    image.set_at((1, 0), (0, 0, 255, 0))
+
+    palettes = [Palette({240: hue}) for hue in [0, 60, 120]]
+
+    variants = Palette.paint_variants(image, palettes, max_workers=2)
+
+    assert len(variants) == 3
+    for (palette, variant) in zip(palettes, variants):
+        expected = palette.paint_image(image)
+        assert np.array_equal(pygame.surfarray.array3d(variant), pygame.surfarray.array3d(expected))
+        assert np.array_equal(pygame.surfarray.array_alpha(variant), pygame.surfarray.array_alpha(image))
+
+    assert Palette.paint_variants(image, []) == []
+
+
+def test_paint_variants_reuses_executor():
+    """
+    Test paint_variants keeps one process pool between calls until it is shut down
+    """
+    image = pygame.Surface((2, 2), pygame.SRCALPHA)
+    image.fill((0, 0, 255, 255))
+    palettes = [Palette({240: 0}), Palette({240: 120})]
+
+    Palette.paint_variants(image, palettes, max_workers=2)
+    executor = Palette.variant_executor
+    Palette.paint_variants(image, palettes, max_workers=2)
+    assert Palette.variant_executor is executor
+    # Workers are spawned, never forked from a process which may be running the render and logic threads
+    assert executor._mp_context.get_start_method() == "spawn"
+
+    # A different worker count replaces the pool
+    Palette.paint_variants(image, palettes, max_workers=1)
+    assert Palette.variant_executor is not executor
+    assert Palette.variant_workers == 1
+
+    Palette.shutdown_executor()
+    assert Palette.variant_executor is None
+    Palette.shutdown_executor()
+
+    variants = Palette.paint_variants(image, palettes, max_workers=1)
+    assert pygame.surfarray.array3d(variants[1])[0, 0].tolist() == [0, 255, 0]
+
+    # The default worker count is one per core
+    assert Palette.executor() is Palette.executor()
+    assert Palette.variant_workers == (os.cpu_count() or 1)
+    Palette.shutdown_executor()
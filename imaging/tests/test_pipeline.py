@@ -0,0 +1,41 @@
+import pygame
+import pytest
+
+from imaging import AssetPipeline, Spritesheet
+
+SHEETS = [
+    ("test_sheet_pad.png", Spritesheet.BREAK_COEFFICIENT_TRANSPARENT, [2, 2]),
+    ("test_sheet_nopad.png", Spritesheet.BREAK_COEFFICIENT_TRANSPARENT, [3, 3, 3]),
+    ("test_sheet_black_pad.png", Spritesheet.BREAK_COEFFICIENT_SOLID, [3, 3, 3]),
+]
+
+
+@pytest.mark.parametrize("use_processes", [False, True])
+def test_pipeline(use_processes):
+    progress = []
+    pipeline = AssetPipeline(max_workers=2, use_processes=use_processes, progress=lambda *p: progress.append(p))
+
+    for (filename, coeff, _) in SHEETS:
+        pipeline.submit(f"assets/testing/img/{filename}", coeff)
+
+    loaded = pipeline.load_all()
+
+    assert progress == [(1, 3), (2, 3), (3, 3)]
+    for (filename, coeff, shape) in SHEETS:
+        frames = loaded[f"assets/testing/img/{filename}"]
+        expected = Spritesheet.fully_slice_file(f"assets/testing/img/{filename}", coeff)
+        assert [len(row) for row in frames] == shape
+        for (row, expected_row) in zip(frames, expected):
+            for (frame, expected_frame) in zip(row, expected_row):
+                assert pygame.image.tostring(frame, "RGBA") == pygame.image.tostring(expected_frame, "RGBA")
+
+
+def test_pipeline_priority():
+    pipeline = AssetPipeline(max_workers=1)
+
+    for (priority, (filename, coeff, _)) in zip([5, 0, 1], SHEETS):
+        pipeline.submit(f"assets/testing/img/{filename}", coeff, priority=priority)
+
+    assert pipeline.total == 3
+    assert [asset.priority for asset in pipeline.load()] == [0, 1, 5]
+    assert pipeline.loaded == 3
@@ -1,8 +1,9 @@
 import pygame
-import time
+import pytest
 
-from imaging import Sprite, AnimatedSprite
-from interface import Anchor
+from imaging import Sprite, AnimatedSprite, FramePool
+from interface import Anchor, Transform
+from events import AnimationScheduler
 
 
 class SimpleSprite(Sprite):
@@ -31,7 +32,14 @@ def test_animated_sprite_default_framedata():
     assert sprite.frame_data == [10]
 
 
-def test_animated_sprite():
+@pytest.fixture
+def scheduler() -> AnimationScheduler:
+    scheduler = AnimationScheduler.get_instance(fresh=True)
+    scheduler.update(0)
+    return scheduler
+
+
+def test_animated_sprite(scheduler):
     frames = [pygame.surface.Surface((1, 1)), pygame.surface.Surface((2, 2))]
     sprite = SimpleAnimatedSprite(frames, [1])
 
@@ -39,13 +47,99 @@ def test_animated_sprite():
     assert sprite.current_frame == 0
 
     sprite.start_animation()
-    time.sleep(0.1)
+    scheduler.update(1)
 
     assert sprite.surface.get_width() == 2
     assert sprite.current_frame == 1
 
-    time.sleep(1)
+    scheduler.update(2)
     sprite.stop_animation()
+    scheduler.update(3)
 
     assert sprite.surface.get_width() == 1
     assert sprite.current_frame == 0
+
+
+def test_animated_sprite_timeline(scheduler):
+    frames = [pygame.surface.Surface((1, 1)) for _ in range(3)]
+    sprite = SimpleAnimatedSprite(frames, [10, 2])
+
+    assert sprite.timeline == [100, 600, 700]
+
+    sprite.start_animation()
+    sprite.start_animation()
+    for (now, frame) in [(0.05, 0), (0.1, 1), (0.599, 1), (0.6, 2), (0.7, 0), (1.35, 2)]:
+        scheduler.update(now)
+        assert sprite.current_frame == frame
+
+    sprite.seek(150)
+    assert sprite.current_frame == 1
+
+
+def test_animated_sprite_pause_and_scale(scheduler):
+    frames = [pygame.surface.Surface((1, 1)) for _ in range(4)]
+    sprite = SimpleAnimatedSprite(frames, [10])
+    sprite.start_animation()
+
+    scheduler.pause()
+    scheduler.update(1)
+    assert sprite.current_frame == 0
+
+    scheduler.resume()
+    scheduler.time_scale = 2
+    scheduler.update(1.1)
+    assert sprite.current_frame == 2
+
+    scheduler.time_scale = 1
+    sprite.time_scale = 0.5
+    scheduler.update(1.3)
+    assert sprite.current_frame == 3
+
+    sprite.stop_animation()
+    assert not scheduler.is_registered(sprite)
+
+
+def test_sprite_optimize():
+    pygame.display.set_mode((1, 1))
+    image = pygame.Surface((2, 2), pygame.SRCALPHA, 32)
+    image.fill((255, 0, 0, 255))
+
+    assert not SimpleSprite(image).surface.get_flags() & pygame.SRCALPHA
+    assert SimpleSprite(image, optimize=False).surface is image
+    assert SimpleAnimatedSprite([image, image]).sprites[0] is SimpleAnimatedSprite([image]).sprites[0]
+    assert SimpleAnimatedSprite([image], optimize=False).sprites[0] is image
+
+
+def test_sprite_transform():
+    image = pygame.Surface((10, 20), pygame.SRCALPHA, 32)
+    sprite = SimpleSprite(image, Anchor.CENTER, optimize=False, transform=Transform(angle=90.4))
+
+    assert sprite.transform == Transform(angle=90)
+    assert sprite.source_surface is image
+    assert sprite.surface.get_size() == (20, 10)
+    assert sprite.surface is sprite.surface
+
+    sprite.transform = Transform()
+    assert sprite.transform is None
+    assert sprite.surface is image
+
+
+def test_animated_sprite_transform():
+    frames = [pygame.Surface((10, 20), pygame.SRCALPHA, 32), pygame.Surface((4, 4), pygame.SRCALPHA, 32)]
+    sprite = SimpleAnimatedSprite(frames, optimize=False, transform=Transform(scale=2))
+
+    assert sprite.source_surface is frames[0]
+    assert sprite.surface.get_size() == (20, 40)
+
+
+def test_animated_sprite_compressed():
+    frames = [pygame.Surface((2, 2), pygame.SRCALPHA, 32) for _ in range(2)]
+    frames[1].fill((255, 0, 0, 255))
+    sprite = SimpleAnimatedSprite(frames, optimize=False, compress=True)
+    pool = FramePool.get_instance(fresh=True)
+
+    assert sprite.surface.get_at((0, 0)) == (0, 0, 0, 0)
+    sprite.seek(100)
+    assert sprite.surface.get_at((0, 0)) == (255, 0, 0, 255)
+    assert sprite.source_surface is sprite.surface
+    assert pool.stats["misses"] == 2
@@ -1,7 +1,16 @@
 import pytest
 import pygame
 
-from imaging import Spritesheet
+import numpy as np
+
+from imaging import Spritesheet, SlicedSheet, Sprite
+from interface import Anchor, Layer, Position, Trim
+
+
+class PlacedSprite(Sprite):
+    @property
+    def position(self):
+        return Position(100, 100)
 
 
 @pytest.mark.parametrize(
@@ -17,3 +26,165 @@ def test_slicing(filename, coeff, expected_shape):
     sliced = Spritesheet.fully_slice_file(f"assets/testing/img/{filename}", coeff)
     assert len(sliced) == expected_shape[0]
     assert [len(row) for row in sliced] == expected_shape[1]
+
+
+@pytest.mark.parametrize(
+    "lines,coeff,expected",
+    [
+        ([0, 1, 1, 0, 1, 1, 0], Spritesheet.BREAK_COEFFICIENT_TRANSPARENT, [(1, 3), (3, 7)]),
+        ([1, 1, 0, 0, 1, 1], Spritesheet.BREAK_COEFFICIENT_TRANSPARENT, [(0, 2), (3, 6)]),
+        ([0, 0, 0], Spritesheet.BREAK_COEFFICIENT_TRANSPARENT, []),
+        ([255, 1, 255, 255, 1, 255], Spritesheet.BREAK_COEFFICIENT_SOLID, [(1, 2), (2, 3), (3, 6)]),
+        ([], Spritesheet.BREAK_COEFFICIENT_TRANSPARENT, []),
+    ],
+)
+def test_find_regions(lines, coeff, expected):
+    alphas = np.array([lines, lines], dtype=np.uint8)
+
+    assert Spritesheet.find_regions(alphas, coeff) == expected
+    assert Spritesheet.find_regions(alphas.T, coeff, by_cols=True) == expected
+
+
+def test_slice_by():
+    surface = pygame.Surface((4, 6), pygame.SRCALPHA)
+    surface.fill((255, 0, 0, 255), pygame.Rect(0, 1, 4, 2))
+    surface.fill((0, 255, 0, 255), pygame.Rect(1, 4, 2, 2))
+
+    rows = Spritesheet.slice_rows(surface, Spritesheet.BREAK_COEFFICIENT_TRANSPARENT)
+    assert [row.get_size() for row in rows] == [(4, 2), (4, 3)]
+    assert rows[1].get_at((1, 2)) == pygame.Color(0, 255, 0, 255)
+
+    columns = Spritesheet.slice_columns(rows[1], Spritesheet.BREAK_COEFFICIENT_TRANSPARENT)
+    assert [column.get_size() for column in columns] == [(3, 3)]
+
+    assert Spritesheet.frame_rects(surface, Spritesheet.BREAK_COEFFICIENT_TRANSPARENT) == [
+        [pygame.Rect(0, 1, 4, 2)],
+        [pygame.Rect(1, 3, 3, 3)],
+    ]
+
+
+@pytest.mark.parametrize(
+    "filename,coeff",
+    [
+        ("test_sheet_pad.png", Spritesheet.BREAK_COEFFICIENT_TRANSPARENT),
+        ("test_sheet_black_pad.png", Spritesheet.BREAK_COEFFICIENT_SOLID),
+    ],
+)
+def test_slice_sheet(filename, coeff):
+    sheet = Spritesheet.slice_sheet_file(f"assets/testing/img/{filename}", coeff)
+    copies = Spritesheet.fully_slice(sheet.surface, coeff)
+
+    assert isinstance(sheet, SlicedSheet)
+    assert len(sheet) == len(copies)
+    for (row, copied_row) in zip(sheet, copies):
+        assert len(row) == len(copied_row)
+        for (frame, copied_frame) in zip(row, copied_row):
+            assert frame.get_parent() is sheet.surface
+            assert pygame.image.tostring(frame, "RGBA") == pygame.image.tostring(copied_frame, "RGBA")
+
+    assert sheet.frame(1, 0) is sheet.row(1)[0]
+    assert sheet[0][1].get_offset() == sheet.rects[0][1].topleft
+
+
+def test_grid_slicing():
+    surface = pygame.Surface((13, 9), pygame.SRCALPHA)
+    # 3 x 2 grid of 3x3 cells with a margin of 1 and spacing of 1; the last cell is left empty
+    for (x, y) in [(1, 1), (5, 1), (9, 1), (1, 5), (5, 5)]:
+        surface.set_at((x + 2, y + 2), (255, 0, 0, 255))
+
+    rects = Spritesheet.grid_rects(surface, (3, 3), margin=1, spacing=1)
+    assert rects == [
+        [pygame.Rect(1, 1, 3, 3), pygame.Rect(5, 1, 3, 3), pygame.Rect(9, 1, 3, 3)],
+        [pygame.Rect(1, 5, 3, 3), pygame.Rect(5, 5, 3, 3)],
+    ]
+
+    sliced = Spritesheet.fully_slice_grid(surface, (3, 3), margin=1, spacing=1)
+    assert [len(row) for row in sliced] == [3, 2]
+    assert sliced[1][1].get_at((2, 2)) == pygame.Color(255, 0, 0, 255)
+
+    assert Spritesheet.grid_rects(surface, (4, 4)) == [
+        [pygame.Rect(0, 0, 4, 4), pygame.Rect(4, 0, 4, 4), pygame.Rect(8, 0, 4, 4)],
+        [pygame.Rect(0, 4, 4, 4), pygame.Rect(4, 4, 4, 4)],
+    ]
+
+
+def test_grid_slicing_without_alpha():
+    # Without per-pixel alpha, every cell is kept
+    sliced = Spritesheet.fully_slice_grid(pygame.image.load("assets/testing/img/grid.jpg"), (32, 32))
+    assert [len(row) for row in sliced] == [3, 3, 3]
+
+    # With a colorkey, cells holding only the key are skipped
+    surface = pygame.Surface((8, 4))
+    surface.fill((255, 0, 255))
+    surface.set_at((5, 1), (0, 0, 0))
+    surface.set_colorkey((255, 0, 255))
+    assert Spritesheet.grid_rects(surface, (4, 4)) == [[pygame.Rect(4, 0, 4, 4)]]
+
+
+@pytest.mark.parametrize(
+    "cell_size, margin, spacing", [((0, 4), 0, 0), ((4, -1), 0, 0), ((4, 4), -1, 0), ((4, 4), 0, -4)]
+)
+def test_grid_slicing_invalid(cell_size, margin, spacing):
+    with pytest.raises(ValueError):
+        Spritesheet.grid_rects(pygame.Surface((8, 8)), cell_size, margin, spacing)
+
+
+def test_component_slicing():
+    surface = pygame.Surface((12, 10), pygame.SRCALPHA)
+    surface.fill((255, 0, 0, 255), pygame.Rect(5, 1, 2, 4))
+    surface.fill((255, 0, 0, 255), pygame.Rect(1, 2, 2, 2))
+    surface.fill((0, 255, 0, 255), pygame.Rect(9, 4, 2, 2))
+    surface.fill((0, 0, 255, 255), pygame.Rect(2, 7, 3, 2))
+
+    rects = Spritesheet.component_rects(surface)
+    assert rects == [
+        [pygame.Rect(1, 2, 2, 2), pygame.Rect(5, 1, 2, 4), pygame.Rect(9, 4, 2, 2)],
+        [pygame.Rect(2, 7, 3, 2)],
+    ]
+
+    sliced = Spritesheet.fully_slice_components(surface)
+    assert [[frame.get_size() for frame in row] for row in sliced] == [[(2, 2), (2, 4), (2, 2)], [(3, 2)]]
+    assert sliced[1][0].get_at((0, 0)) == pygame.Color(0, 0, 255, 255)
+
+
+def test_trim():
+    surface = pygame.Surface((6, 5), pygame.SRCALPHA)
+    surface.fill((255, 0, 0, 255), pygame.Rect(2, 1, 3, 2))
+
+    (trimmed, trim) = Spritesheet.trim(surface)
+
+    assert trimmed.get_size() == (3, 2)
+    assert trim == Trim(2, 1, 6, 5)
+
+    (frames, trims) = Spritesheet.trim_frames([[surface], [surface, trimmed]])
+    assert [[frame.get_size() for frame in row] for row in frames] == [[(3, 2)], [(3, 2), (3, 2)]]
+    assert trims == [[Trim(2, 1, 6, 5)], [Trim(2, 1, 6, 5), Trim(0, 0, 3, 2)]]
+
+
+def test_trimmed_sheet_placement():
+    """
+    Trimmed frames land on exactly the same screen pixels as untrimmed frames
+    """
+    sheet = Spritesheet.slice_sheet_file("assets/testing/img/sheet_robot.png", 0)
+    trimmed = sheet.trimmed()
+    retrimmed = trimmed.trimmed()
+
+    assert retrimmed.trims == trimmed.trims
+    assert retrimmed.rects == trimmed.rects
+
+    area = sum(frame.get_width() * frame.get_height() for row in sheet for frame in row)
+    trimmed_area = sum(frame.get_width() * frame.get_height() for row in trimmed for frame in row)
+    assert trimmed_area < area
+
+    for anchor in [Anchor.TOP_LEFT, Anchor.CENTER, Anchor.BOTTOM_RIGHT]:
+        for (row, trimmed_row, trims) in zip(sheet, trimmed, trimmed.trims):
+            for (frame, trimmed_frame, trim) in zip(row, trimmed_row, trims):
+                screens = []
+                for sprite in [PlacedSprite(frame, anchor), PlacedSprite(trimmed_frame, anchor, trim)]:
+                    layer = Layer()
+                    layer.add_renderable(sprite)
+                    screen = pygame.Surface((200, 200))
+                    layer.blit(Position(), screen)
+                    screens.append(pygame.image.tostring(screen, "RGB"))
+
+                assert screens[0] == screens[1]
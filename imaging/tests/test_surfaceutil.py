@@ -0,0 +1,50 @@
+import pygame
+
+from imaging.surfaceutil import SurfaceLRU, surface_bytes, surface_digest
+
+
+def test_surface_digest():
+    surface = pygame.Surface((4, 2), pygame.SRCALPHA, 32)
+    same = pygame.Surface((4, 2), pygame.SRCALPHA, 32)
+    transposed = pygame.Surface((2, 4), pygame.SRCALPHA, 32)
+
+    assert surface_digest(surface) == surface_digest(same)
+    assert surface_digest(surface) != surface_digest(transposed)
+
+    same.set_at((0, 0), (1, 2, 3, 255))
+    assert surface_digest(surface) != surface_digest(same)
+
+
+def test_surface_bytes():
+    surface = pygame.Surface((4, 2), pygame.SRCALPHA, 32)
+
+    assert surface_bytes(surface) == surface.get_pitch() * 2
+
+
+def test_surface_lru():
+    surfaces = [pygame.Surface((4, 4), pygame.SRCALPHA, 32) for _ in range(3)]
+    size = surface_bytes(surfaces[0])
+    store = SurfaceLRU(size * 2)
+
+    assert store.lookup("a") is None
+    store.store("a", surfaces[0], "owner")
+    store.store("b", surfaces[1])
+    assert store.lookup("a") is surfaces[0]
+    assert store.entries["a"] == ("owner", surfaces[0])
+
+    # A key stored by a racing miss is kept, and not counted twice
+    store.store("a", surfaces[2])
+    assert store.lookup("a") is surfaces[0]
+    assert store.bytes_used == size * 2
+
+    # "b" is least recently used, so it makes room for "c"
+    store.store("c", surfaces[2])
+    assert list(store.entries) == ["a", "c"]
+    assert store.stats == {"hits": 2, "misses": 1, "evictions": 1, "entries": 2, "bytes": size * 2}
+
+    store.store("d", pygame.Surface((16, 16), pygame.SRCALPHA, 32))
+    assert "d" not in store.entries
+
+    store.clear()
+    assert store.stats["entries"] == 0
+    assert store.bytes_used == 0
@@ -0,0 +1,99 @@
+import pygame
+
+from imaging import TransformCache
+from interface import Transform
+
+
+def make_surface(size=(4, 2)):
+    surface = pygame.Surface(size, pygame.SRCALPHA, 32)
+    surface.fill((255, 0, 0, 255))
+    surface.set_at((0, 0), (0, 0, 255, 255))
+    return surface
+
+
+def test_transformcache_singleton():
+    cache = TransformCache.get_instance()
+
+    assert TransformCache.get_instance() is cache
+    assert TransformCache.get_instance(fresh=True) is not cache
+
+
+def test_quantize():
+    cache = TransformCache(angle_step=5)
+
+    assert cache.quantize(Transform(angle=-2.4, scale=1.004)) == Transform(angle=0, scale=1)
+    assert cache.quantize(Transform(angle=362.6, scale=0.5)) == Transform(angle=5, scale=0.5)
+    assert cache.quantize(Transform(scale=0)).scale == cache.scale_step
+
+
+def test_transform():
+    cache = TransformCache()
+    surface = make_surface()
+
+    assert cache.transform(surface, Transform(angle=360)) is surface
+
+    rotated = cache.transform(surface, Transform(angle=90.2))
+    assert rotated.get_size() == (2, 4)
+    assert rotated.get_at((0, 3)) == (0, 0, 255, 255)
+    assert cache.transform(surface, Transform(angle=89.9)) is rotated
+
+    flipped = cache.transform(surface, Transform(flip_x=True, scale=2))
+    assert flipped.get_size() == (8, 4)
+    assert flipped.get_at((7, 0)).b > flipped.get_at((0, 0)).b
+
+    assert cache.stats == {
+        "hits": 1,
+        "misses": 2,
+        "evictions": 0,
+        "entries": 2,
+        "bytes": rotated.get_pitch() * 4 + flipped.get_pitch() * 4,
+    }
+
+
+def test_transform_opaque_rotation():
+    surface = pygame.Surface((4, 4))
+    surface.fill((255, 255, 255))
+    rotated = TransformCache().transform(surface, Transform(angle=45))
+
+    assert rotated.get_flags() & pygame.SRCALPHA
+    assert rotated.get_at((0, 0)).a == 0
+
+
+def test_transform_indexed_scale():
+    surface = pygame.Surface((2, 2), 0, 8)
+
+    assert TransformCache().transform(surface, Transform(scale=1.5)).get_size() == (3, 3)
+
+
+def test_transform_eviction():
+    surface = make_surface((8, 8))
+    cache = TransformCache(max_bytes=8 * 8 * 4 * 2)
+
+    for angle in [90, 180, 270]:
+        cache.transform(surface, Transform(angle=angle))
+
+    assert cache.stats["evictions"] == 1
+    assert cache.stats["entries"] == 2
+
+    cache.transform(surface, Transform(scale=4))
+    assert cache.stats["entries"] == 2
+
+    cache.clear()
+    assert cache.stats["entries"] == 0
+    assert cache.stats["bytes"] == 0
+
+
+def test_transform_colorkey_scale():
+    pygame.display.set_mode((1, 1))
+    keyed = pygame.Surface((8, 8))
+    keyed.fill((255, 0, 255))
+    keyed.fill((0, 200, 0), (2, 2, 4, 4))
+    keyed.set_colorkey((255, 0, 255), pygame.RLEACCEL)
+
+    scaled = TransformCache().transform(keyed, Transform(scale=2.5))
+    pixels = [scaled.get_at((x, y)) for x in range(scaled.get_width()) for y in range(scaled.get_height())]
+
+    assert scaled.get_size() == (20, 20)
+    assert not [color for color in pixels if color.a and color.r > 64 and color.b > 64]
+    assert scaled.get_at((0, 0)).a == 0
+    assert scaled.get_at((10, 10)) == (0, 200, 0, 255)
@@ -0,0 +1,110 @@
+"""
+Transform cache
+
+Rotating, scaling or mirroring a sprite resamples it into a brand new surface. Sprites which are drawn
+transformed every frame would pay for that every frame, so the TransformCache keeps recently used variants,
+keyed by source surface and (quantized) transform, within a byte budget.
+
+Angles are quantized (to whole degrees by default) so a slowly turning unit reuses its variants, and scales
+are quantized to a 1/64 step.
+
+When using the cache, use TransformCache.get_instance() to retrieve the shared cache. Transformed surfaces are
+shared between callers, so they should be treated as read only.
+"""
+import pygame
+
+from imaging.surfaceutil import SurfaceLRU
+from interface import Transform
+
+
+class TransformCache(SurfaceLRU):
+    """
+    Least recently used cache of transformed surfaces, bounded by the number of bytes of pixel data held
+    """
+
+    SINGLETON = None
+
+    DEFAULT_MAX_BYTES: int = 32 * 1024 * 1024
+
+    @staticmethod
+    def get_instance(fresh: bool = False) -> "TransformCache":
+        """
+        Returns a singleton of the transform cache
+        """
+        if not TransformCache.SINGLETON or fresh:
+            TransformCache.SINGLETON = TransformCache()
+
+        return TransformCache.SINGLETON
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, angle_step: float = 1, scale_step: float = 1 / 64):
+        """
+        Creates a transform cache
+
+        :param max_bytes: The number of bytes of surface data the cache may hold before evicting entries
+        :param angle_step: Angles are rounded to a multiple of this many degrees
+        :param scale_step: Scales are rounded to a multiple of this
+        """
+        super().__init__(max_bytes)
+        self.angle_step: float = angle_step
+        self.scale_step: float = scale_step
+
+    def quantize(self, transform: Transform) -> Transform:
+        """
+        Rounds a transform's angle and scale to the cache's steps
+        """
+        angle = (round(transform.angle / self.angle_step) * self.angle_step) % 360
+        scale = max(round(transform.scale / self.scale_step), 1) * self.scale_step
+        return transform._replace(angle=angle, scale=scale)
+
+    def transform(self, surface: pygame.Surface, transform: Transform) -> pygame.Surface:
+        """
+        Returns the surface with a transform applied, transforming it only if it is not already cached
+
+        :param surface: The source surface
+        :param transform: The transform, which is quantized first
+        """
+        transform = self.quantize(transform)
+        if transform.is_identity:
+            return surface
+
+        key = (id(surface), transform)
+
+        transformed = self.lookup(key)
+        if transformed is None:
+            transformed = TransformCache.apply(surface, transform)
+            self.store(key, transformed, surface)
+        return transformed
+
+    @staticmethod
+    def apply(surface: pygame.Surface, transform: Transform) -> pygame.Surface:
+        """
+        Transforms a surface: mirrored, then scaled, then rotated
+        """
+        if transform.flip_x or transform.flip_y:
+            surface = pygame.transform.flip(surface, transform.flip_x, transform.flip_y)
+
+        if transform.scale != 1:
+            if surface.get_colorkey() is not None and not surface.get_flags() & pygame.SRCALPHA:
+                # Filtering would blend the colorkey into the edges, so scale with real transparency instead
+                unkeyed = pygame.Surface(surface.get_size(), pygame.SRCALPHA, 32)
+                unkeyed.blit(surface, (0, 0))
+                surface = unkeyed
+            size = (
+                max(round(surface.get_width() * transform.scale), 1),
+                max(round(surface.get_height() * transform.scale), 1),
+            )
+            if surface.get_bitsize() >= 24:
+                surface = pygame.transform.smoothscale(surface, size)
+            else:
+                surface = pygame.transform.scale(surface, size)
+
+        if transform.angle != 0:
+            opaque = not surface.get_flags() & pygame.SRCALPHA and surface.get_colorkey() is None
+            if opaque and transform.angle % 90 != 0:
+                # Without alpha or a colorkey, rotate pads the corners with the top left pixel's color
+                padded = pygame.Surface(surface.get_size(), pygame.SRCALPHA, 32)
+                padded.blit(surface, (0, 0))
+                surface = padded
+            surface = pygame.transform.rotate(surface, transform.angle)
+
+        return surface
@@ -4,5 +4,7 @@ Interface package provides functionality for rendering to the screen
 
 from interface.constants import Anchor
 from interface.position import Position
+from interface.trim import Trim
+from interface.transform import Transform
 from interface.viewport import Layer, Viewport
 from interface.window import Window
@@ -17,3 +17,17 @@ class Anchor(Enum):
     BOTTOM_LEFT = 6
     BOTTOM_CENTER = 7
     BOTTOM_RIGHT = 8
+
+
+# (x, y) fraction of a surface's width and height at which each anchor lies, indexed by Anchor value
+ANCHOR_FACTORS = (
+    (0, 0),
+    (0.5, 0),
+    (1, 0),
+    (0, 0.5),
+    (0.5, 0.5),
+    (1, 0.5),
+    (0, 1),
+    (0.5, 1),
+    (1, 1),
+)
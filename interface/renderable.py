@@ -1,8 +1,10 @@
+import math
 import pygame
 from abc import ABC, abstractmethod, abstractproperty
-from interface import Position, Anchor
+from interface import Position, Anchor, Trim, Transform
+from interface.constants import ANCHOR_FACTORS
 
-from typing import List
+from typing import List, Tuple
 
 
 class Renderable(ABC):
@@ -34,48 +36,118 @@ class Renderable(ABC):
         """
         return Anchor.TOP_LEFT
 
+    @property
+    def trim(self) -> Trim:
+        """
+        Should return how the surface was trimmed from its full frame, or None if it is untrimmed
+        Anchoring works from the full frame, so trimming never moves the renderable on screen
+        """
+        return None
+
+    @property
+    def transform(self) -> Transform:
+        """
+        Should return how the surface is transformed (rotated, scaled, flipped), or None if it is not
+        When transformed, surface should return the transformed surface and source_surface the original
+        """
+        return None
+
+    @property
+    def source_surface(self) -> pygame.Surface:
+        """
+        Should return the surface before any transform is applied
+        """
+        return self.surface
+
     @property
     def anchored_position(self) -> Position:
         """
         Returns the position, with appropriate Anchoring offset
         """
-        width = self.surface.get_width()
-        height = self.surface.get_height()
-        half_width = width / 2
-        half_height = height / 2
-
-        anchor_offset = (0, 0)
-
-        # Most used first for optimization
-        if self.anchor == Anchor.BOTTOM_CENTER:
-            anchor_offset = (half_width, height)
-        elif self.anchor == Anchor.CENTER:
-            anchor_offset = (half_width, half_height)
-        elif self.anchor == Anchor.TOP_CENTER:
-            anchor_offset = (half_width, 0)
-        elif self.anchor == Anchor.CENTER_LEFT:
-            anchor_offset = (0, half_height)
-        elif self.anchor == Anchor.CENTER_RIGHT:
-            anchor_offset = (width, half_height)
-        elif self.anchor == Anchor.TOP_RIGHT:
-            anchor_offset = (width, 0)
-        elif self.anchor == Anchor.BOTTOM_LEFT:
-            anchor_offset = (0, height)
-        elif self.anchor == Anchor.BOTTOM_RIGHT:
-            anchor_offset = (width, height)
-
-        return self.position.shifted(-anchor_offset[0], -anchor_offset[1])
+        return Position(*self.anchored_coordinates)
+
+    @property
+    def anchored_coordinates(self) -> Tuple[float, float]:
+        """
+        Returns the anchored position as an (x, y) tuple, for the render path
+        """
+        offset = self.anchor_offset
+        position = self.position
+        return (position.x - offset[0], position.y - offset[1])
+
+    def anchored_position_into(self, out: Position) -> Position:
+        """
+        Writes the anchored position into an existing position rather than allocating one, returning it
+        """
+        offset = self.anchor_offset
+        position = self.position
+        out.x = position.x - offset[0]
+        out.y = position.y - offset[1]
+        return out
+
+    @property
+    def anchor_offset(self) -> Tuple[float, float]:
+        """
+        Returns the offset from the top left of the surface to the anchor
+
+        The offset only depends on the surface size, anchor, trim and transform, so it is cached until one of
+        those changes (surfaces can't be resized, so the surface itself stands in for its size)
+        """
+        source = self.source_surface
+        anchor = self.anchor
+        trim = self.trim
+        transform = self.transform
+
+        cached = self.__dict__.get("_anchor_offset_cache")
+        if (
+            cached is not None
+            and cached[0] is source
+            and cached[1] is anchor
+            and cached[2] == trim
+            and cached[3] == transform
+        ):
+            return cached[4]
+
+        if trim is None:
+            (width, height) = source.get_size()
+        else:
+            (width, height) = (trim.width, trim.height)
+
+        (x_factor, y_factor) = ANCHOR_FACTORS[anchor.value]
+        offset = (width * x_factor, height * y_factor)
+
+        if trim is not None:
+            offset = (offset[0] - trim.x, offset[1] - trim.y)
+
+        if transform is not None:
+            offset = self.transformed_offset(offset, transform)
+
+        self._anchor_offset_cache = (source, anchor, trim, transform, offset)
+        return offset
+
+    def transformed_offset(self, offset: Tuple[float, float], transform: Transform) -> Tuple[float, float]:
+        """
+        Maps an offset within the source surface to the same point within the transformed surface, so the
+        anchor stays put however the surface is rotated, scaled or flipped
+        """
+        (source_width, source_height) = self.source_surface.get_size()
+        (width, height) = self.surface.get_size()
+
+        # Relative to the center, which every transform keeps in place
+        x = (offset[0] - source_width / 2) * transform.scale * (-1 if transform.flip_x else 1)
+        y = (offset[1] - source_height / 2) * transform.scale * (-1 if transform.flip_y else 1)
+
+        # Counterclockwise on screen, where y points down
+        radians = math.radians(transform.angle)
+        (cos, sin) = (math.cos(radians), math.sin(radians))
+
+        return (width / 2 + x * cos + y * sin, height / 2 - x * sin + y * cos)
 
     def position_intersects(self, position: Position) -> bool:
         """
         Returns true if the supplied position intersects with this renderable's surface
         """
-        top_left = self.anchored_position
-        bottom_right = top_left.shifted(self.surface.get_width(), self.surface.get_height())
+        (left, top) = self.anchored_coordinates
+        (width, height) = self.surface.get_size()
 
-        return (
-            position.x >= top_left.x
-            and position.x <= bottom_right.x
-            and position.y >= top_left.y
-            and position.y <= bottom_right.y
-        )
+        return position.x >= left and position.x <= left + width and position.y >= top and position.y <= top + height
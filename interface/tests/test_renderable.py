@@ -2,7 +2,7 @@ import pytest
 import pygame
 
 from interface.renderable import Renderable
-from interface import Anchor, Position
+from interface import Anchor, Position, Trim, Transform
 
 
 class DemoRenderable(Renderable):
@@ -65,3 +65,90 @@ def test_anchored_positions(anchor, expected_renderable_location):
 def test_position_intersects(anchor, test_click_position, expected):
     dr = DemoRenderable(pygame.surface.Surface((10, 10)), anchor)
     assert dr.position_intersects(Position(*test_click_position)) == expected
+
+
+class TrimmedRenderable(DemoRenderable):
+    def __init__(self, f, a, t):
+        super().__init__(f, a)
+        self._trim = t
+
+    @property
+    def trim(self):
+        return self._trim
+
+
+@pytest.mark.parametrize(
+    "anchor,expected_renderable_location",
+    [(Anchor.TOP_LEFT, (2, 3)), (Anchor.CENTER, (-3, -2)), (Anchor.BOTTOM_RIGHT, (-8, -7))],
+)
+def test_trimmed_anchored_positions(anchor, expected_renderable_location):
+    # A 4x4 surface cut from (2, 3) of a 10x10 frame anchors as the full frame would, shifted by the trim
+    dr = TrimmedRenderable(pygame.surface.Surface((4, 4)), anchor, Trim(2, 3, 10, 10))
+    ap = dr.anchored_position
+    assert ap.x == expected_renderable_location[0]
+    assert ap.y == expected_renderable_location[1]
+
+
+class TransformedRenderable(DemoRenderable):
+    def __init__(self, f, a, t):
+        super().__init__(f, a)
+        self._transform = t
+
+    @property
+    def transform(self):
+        return self._transform
+
+    @property
+    def source_surface(self):
+        return self.f
+
+    @property
+    def surface(self):
+        surface = pygame.transform.flip(self.f, self._transform.flip_x, self._transform.flip_y)
+        (width, height) = self.f.get_size()
+        surface = pygame.transform.scale(surface, (width * self._transform.scale, height * self._transform.scale))
+        return pygame.transform.rotate(surface, self._transform.angle)
+
+
+@pytest.mark.parametrize(
+    "anchor,transform,expected_renderable_location",
+    [
+        (Anchor.CENTER, Transform(angle=90), (-10, -5)),
+        (Anchor.CENTER, Transform(angle=45), (-10.5, -10.5)),
+        (Anchor.BOTTOM_CENTER, Transform(angle=90), (-20, -5)),
+        (Anchor.BOTTOM_CENTER, Transform(angle=180), (-5, 0)),
+        (Anchor.TOP_LEFT, Transform(flip_x=True), (-10, 0)),
+        (Anchor.TOP_LEFT, Transform(flip_y=True), (0, -20)),
+        (Anchor.CENTER, Transform(scale=2), (-10, -20)),
+        (Anchor.BOTTOM_CENTER, Transform(scale=2), (-10, -40)),
+    ],
+)
+def test_transformed_anchored_positions(anchor, transform, expected_renderable_location):
+    dr = TransformedRenderable(pygame.surface.Surface((10, 20)), anchor, transform)
+    ap = dr.anchored_position
+    assert ap.x == pytest.approx(expected_renderable_location[0])
+    assert ap.y == pytest.approx(expected_renderable_location[1])
+
+
+def test_anchor_offset_cache():
+    dr = DemoRenderable(pygame.surface.Surface((10, 10)), Anchor.CENTER)
+    offset = dr.anchor_offset
+
+    assert offset == (5, 5)
+    assert dr.anchor_offset is offset
+
+    dr._anchor = Anchor.BOTTOM_RIGHT
+    assert dr.anchor_offset == (10, 10)
+
+    dr.f = pygame.surface.Surface((4, 6))
+    assert dr.anchor_offset == (4, 6)
+
+
+def test_anchored_coordinates():
+    dr = DemoRenderable(pygame.surface.Surface((10, 10)), Anchor.BOTTOM_CENTER)
+    dr._position = Position(20, 30)
+    out = Position()
+
+    assert dr.anchored_coordinates == (15, 20)
+    assert dr.anchored_position_into(out) is out
+    assert (out.x, out.y) == (15, 20)
@@ -1,3 +1,5 @@
+import math
+import pytest
 import pygame
 
 from interface import Viewport, Position, Layer
@@ -7,9 +9,15 @@ from interface.renderable import Renderable
 class MockSurface:
     def __init__(self, expected):
         self.expected = expected
+        self.blitted = []
 
     def blit(self, surface, location):
         assert location == self.expected
+        self.blitted.append(surface)
+
+    def blits(self, blit_sequence, doreturn=True):
+        for (surface, location) in blit_sequence:
+            self.blit(surface, location)
 
     def get_width(self):
         return 100
@@ -46,19 +54,20 @@ def test_layer_add_remove():
 
 def test_layer_scaling():
     layer: Layer = Layer(motion_scale=(2, -2))
-    dr = DemoRenderable(pygame.surface.Surface((10, 10)))
+    dr = DemoRenderable(pygame.surface.Surface((20, 20)))
 
     ms = MockSurface((-10, 10))
 
     layer.add_renderable(dr)
     layer.blit(Position(5, 5), ms)
+    assert ms.blitted == [dr.surface]
 
 
 def test_viewport():
     vp = Viewport()
 
     layer: Layer = Layer(motion_scale=(2, -2))
-    dr = DemoRenderable(pygame.surface.Surface((10, 10)))
+    dr = DemoRenderable(pygame.surface.Surface((20, 20)))
 
     ms = MockSurface((-10, 10))
 
@@ -86,3 +95,318 @@ def test_viewport():
     # Try blitting
     vp.add_layer(5, layer)
     vp.blit(ms)
+    assert ms.blitted == [dr.surface]
+
+
+class RecordingSurface(MockSurface):
+    def __init__(self):
+        super().__init__(None)
+        self.locations = []
+
+    def blit(self, surface, location):
+        self.locations.append(location)
+        self.blitted.append(surface)
+
+
+def test_layer_culling():
+    layer: Layer = Layer()
+    renderables = [DemoRenderable(pygame.surface.Surface((10, 10))) for _ in range(5)]
+    for (dr, position) in zip(renderables, [(-10, 0), (0, -10), (-5, -5), (100, 0), (95, 95)]):
+        dr._position = Position(*position)
+        layer.add_renderable(dr)
+
+    rs = RecordingSurface()
+    layer.blit(Position(), rs)
+
+    assert rs.blitted == [renderables[2].surface, renderables[4].surface]
+
+
+def test_layer_grid():
+    layer: Layer = Layer(cell_size=50)
+    renderables = []
+    for x in range(0, 1000, 20):
+        dr = DemoRenderable(pygame.surface.Surface((10, 10)))
+        dr._position = Position(x, x)
+        renderables.append(dr)
+        layer.add_renderable(dr)
+
+    # Added last, but starts further left: draw order must still follow insertion
+    late = DemoRenderable(pygame.surface.Surface((10, 10)))
+    late._position = Position(210, 200)
+    layer.add_renderable(late)
+
+    assert layer.visible_renderables(Position(200, 200), RecordingSurface()) == renderables[10:15] + [late]
+
+    rs = RecordingSurface()
+    layer.blit(Position(200, 200), rs)
+    assert rs.locations == [(x - 200, x - 200) for x in range(200, 300, 20)] + [(10, 0)]
+
+    late.position.shift(500, 500)
+    layer.update_renderable(late)
+    assert late not in layer.visible_renderables(Position(200, 200), rs)
+    assert late in layer.visible_renderables(Position(700, 700), rs)
+
+    layer.remove_renderable(late)
+    assert late not in layer.visible_renderables(Position(700, 700), rs)
+    assert id(late) not in layer.cells
+    layer.update_renderable(late)
+    assert id(late) not in layer.cells
+
+
+def test_layer_grid_motion_scale():
+    layer: Layer = Layer(motion_scale=(0.5, 0.5), cell_size=32)
+    dr = DemoRenderable(pygame.surface.Surface((10, 10)))
+    dr._position = Position(150, 150)
+    layer.add_renderable(dr)
+
+    assert layer.visible_renderables(Position(200, 200), RecordingSurface()) == [dr]
+    assert layer.visible_renderables(Position(600, 600), RecordingSurface()) == []
+
+    layer.remove_renderable(dr)
+    assert layer.grid == {}
+
+
+def test_layer_grid_moving_renderable():
+    layer: Layer = Layer(cell_size=32)
+    walker = DemoRenderable(pygame.surface.Surface((10, 10)))
+    layer.add_renderable(walker)
+    rs = RecordingSurface()
+
+    # Moving without telling the layer leaves the grid stale, so the renderable vanishes from its new position
+    walker.position.shift(300, 0)
+    assert layer.build_draw_list(Position(290, 0), rs) == []
+    layer.update_renderable(walker)
+    assert layer.build_draw_list(Position(290, 0), rs) == [(walker.surface, (10, 0))]
+
+    # Walking one step at a time across many cells with the camera following, it is drawn after every step
+    for step in range(1, 40):
+        layer.move_renderable(walker, 9, 4)
+        camera = walker.position.shifted(-45, -45)
+        assert layer.build_draw_list(camera, rs) == [(walker.surface, (45, 45))]
+    assert (walker.position.x, walker.position.y) == (300 + 39 * 9, 39 * 4)
+
+
+def test_layer_draw_list():
+    layer: Layer = Layer()
+    renderables = [DemoRenderable(pygame.surface.Surface((10, 10))) for _ in range(3)]
+    for dr in renderables:
+        layer.add_renderable(dr)
+
+    draw_list = layer.build_draw_list(Position(), RecordingSurface())
+    assert draw_list == [(dr.surface, (0, 0)) for dr in renderables]
+
+    renderables[1].position.shift(200, 0)
+    assert layer.build_draw_list(Position(), RecordingSurface()) is draw_list
+    assert draw_list == [(renderables[0].surface, (0, 0)), (renderables[2].surface, (0, 0))]
+
+
+def test_layer_blits_identical():
+    layer: Layer = Layer()
+    for (index, color) in enumerate([(255, 0, 0), (0, 255, 0), (0, 0, 255)]):
+        dr = DemoRenderable(pygame.surface.Surface((20, 20)))
+        dr.f.fill(color)
+        dr._position = Position(index * 10 - 5, index * 10 - 5)
+        layer.add_renderable(dr)
+
+    batched = pygame.surface.Surface((40, 40))
+    layer.blit(Position(), batched)
+
+    individual = pygame.surface.Surface((40, 40))
+    for dr in layer.renderables.values():
+        individual.blit(dr.surface, dr.anchored_coordinates)
+
+    assert pygame.image.tostring(batched, "RGB") == pygame.image.tostring(individual, "RGB")
+
+
+def make_scene():
+    vp = Viewport()
+    layer: Layer = Layer()
+    renderables = []
+    for (index, color) in enumerate([(255, 0, 0), (0, 255, 0), (0, 0, 255)]):
+        dr = DemoRenderable(pygame.surface.Surface((10, 10)))
+        dr.f.fill(color)
+        dr._position = Position(index * 30, index * 30)
+        renderables.append(dr)
+        layer.add_renderable(dr)
+    vp.add_layer(1, layer)
+    return (vp, renderables)
+
+
+def render_full(vp):
+    surface = pygame.surface.Surface((100, 100))
+    vp.blit(surface)
+    return pygame.image.tostring(surface, "RGB")
+
+
+def test_viewport_blit_dirty():
+    (vp, renderables) = make_scene()
+    surface = pygame.surface.Surface((100, 100))
+
+    assert vp.blit_dirty(surface) == [surface.get_rect()]
+    assert vp.blit_dirty(surface) == []
+
+    renderables[1].position.shift(5, 0)
+    rects = vp.blit_dirty(surface)
+    assert rects == [pygame.Rect(30, 30, 15, 10)]
+    assert pygame.image.tostring(surface, "RGB") == render_full(vp)
+
+    renderables[2].f = pygame.surface.Surface((10, 10))
+    assert vp.blit_dirty(surface) == [pygame.Rect(60, 60, 10, 10)]
+    assert pygame.image.tostring(surface, "RGB") == render_full(vp)
+
+    # Fractional moves only dirty the screen once they reach another pixel
+    renderables[0].position.shift(0.4, 0.6)
+    assert vp.blit_dirty(surface) == []
+    renderables[0].position.shift(0.7, 0)
+    assert vp.blit_dirty(surface) == [pygame.Rect(0, 0, 11, 10)]
+    assert pygame.image.tostring(surface, "RGB") == render_full(vp)
+
+
+def test_viewport_blit_dirty_full_redraw():
+    (vp, renderables) = make_scene()
+    surface = pygame.surface.Surface((100, 100))
+    vp.blit_dirty(surface)
+
+    vp.position.shift(1, 0)
+    assert vp.blit_dirty(surface) == [surface.get_rect()]
+    assert pygame.image.tostring(surface, "RGB") == render_full(vp)
+
+    vp.invalidate()
+    assert vp.blit_dirty(surface) == [surface.get_rect()]
+
+    big = DemoRenderable(pygame.surface.Surface((90, 90)))
+    vp.layers[1].add_renderable(big)
+    assert vp.blit_dirty(surface) == [surface.get_rect()]
+
+
+def test_merge_rects():
+    rects = [pygame.Rect(0, 0, 10, 10), pygame.Rect(50, 50, 10, 10), pygame.Rect(5, 5, 10, 10), pygame.Rect(0, 0, 0, 5)]
+
+    assert Viewport.merge_rects(rects) == [pygame.Rect(50, 50, 10, 10), pygame.Rect(0, 0, 15, 15)]
+
+
+def make_decorations(layer):
+    decorations = []
+    for (index, alpha) in enumerate([255, 0, 128, 255, 64]):
+        dr = DemoRenderable(pygame.surface.Surface((24, 24), pygame.SRCALPHA, 32))
+        dr.f.fill((40 * index, 200 - 30 * index, 90, 255))
+        dr.f.fill((250, 250, 0, alpha), (4, 4, 16, 16))
+        dr._position = Position(index * 17 - 20, index * 13 - 10)
+        decorations.append(dr)
+        layer.add_renderable(dr)
+
+    opaque = DemoRenderable(pygame.surface.Surface((30, 10)))
+    opaque.f.fill((1, 2, 3))
+    opaque._position = Position(25, 25)
+    decorations.append(opaque)
+    layer.add_renderable(opaque)
+    return decorations
+
+
+def render_layer(layer, position=Position()):
+    surface = pygame.surface.Surface((80, 60))
+    surface.fill((30, 60, 90))
+    layer.blit(position, surface)
+    return pygame.surfarray.array3d(surface).astype(int)
+
+
+def test_static_layer():
+    static: Layer = Layer(motion_scale=(0.5, 0.5), static=True, chunk_size=32)
+    dynamic: Layer = Layer(motion_scale=(0.5, 0.5))
+    make_decorations(static)
+    make_decorations(dynamic)
+
+    for position in [Position(), Position(30, 10), Position(-20, -14)]:
+        assert abs(render_layer(static, position) - render_layer(dynamic, position)).max() <= 1
+
+    # Only the non-empty chunks overlapping the 80x60 surface are drawn; nothing covers chunk (2, 0)
+    assert len(static.build_draw_list(Position(), pygame.surface.Surface((80, 60)))) == 5
+    assert len(static.build_draw_list(Position(400, 400), pygame.surface.Surface((80, 60)))) == 0
+
+
+def test_static_layer_invalidation():
+    static: Layer = Layer(static=True, chunk_size=32)
+    decorations = make_decorations(static)
+    render_layer(static)
+    chunks = dict(static.chunks)
+
+    decorations[0].position.shift(40, 0)
+    static.update_renderable(decorations[0])
+    assert static.dirty_chunks == {(-1, -1), (-1, 0), (0, -1), (0, 0), (1, -1), (1, 0)}
+
+    rendered = render_layer(static)
+    assert static.chunks[(1, 1)] is chunks[(1, 1)]
+    assert static.chunks[(0, 0)] is not chunks[(0, 0)]
+    assert (-1, -1) not in static.chunks
+
+    dynamic: Layer = Layer()
+    for dr in static.renderables.values():
+        dynamic.add_renderable(dr)
+    assert abs(rendered - render_layer(dynamic)).max() <= 1
+
+    for dr in decorations:
+        static.remove_renderable(dr)
+    render_layer(static)
+    assert static.chunks == {}
+
+
+@pytest.mark.parametrize(
+    "motion_scale,position",
+    [((0.37, 0.61), Position(13.3, 7.9)), ((1.5, 1), Position(-7.25, 3.5)), ((0.25, 0.75), Position(101.7, 55.1))],
+)
+def test_layer_fractional(motion_scale, position):
+    static: Layer = Layer(motion_scale=motion_scale, static=True, chunk_size=16)
+    dynamic: Layer = Layer(motion_scale=motion_scale)
+
+    # A row of abutting opaque tiles at fractional positions, crossing several chunk borders
+    tiles = []
+    for index in range(12):
+        tile = DemoRenderable(pygame.surface.Surface((7, 9)))
+        tile.f.fill((20 * index, 255 - 20 * index, (90 * index) % 256))
+        tile._position = Position(index * 7 + 0.6, index * 2.3 + 0.4)
+        static.add_renderable(tile)
+        dynamic.add_renderable(tile)
+        tiles.append(tile)
+
+    def render_tiles(place):
+        surface = pygame.surface.Surface((80, 60))
+        surface.fill((30, 60, 90))
+        for tile in tiles:
+            surface.blit(tile.surface, place(tile.position))
+        return pygame.surfarray.array3d(surface).astype(int)
+
+    (left, top) = (position.x * motion_scale[0], position.y * motion_scale[1])
+
+    # Ordinary layers blit at the exact scaled position, as they always have
+    assert (render_layer(dynamic, position) != render_tiles(lambda p: (p.x - left, p.y - top))).sum() == 0
+
+    # Static layers snap the origin and each renderable down to whole pixels, once each
+    assert static.chunk_origin(position) == (math.floor(left), math.floor(top))
+    snapped = render_tiles(lambda p: (math.floor(p.x) - math.floor(left), math.floor(p.y) - math.floor(top)))
+    assert (render_layer(static, position) != snapped).sum() == 0
+
+
+@pytest.mark.parametrize("cell_size", [None, 128])
+def test_static_layer_bake_uses_grid(cell_size):
+    static: Layer = Layer(cell_size=cell_size, static=True, chunk_size=32)
+    assert static.cell_size == (cell_size or 32)
+
+    renderables = [DemoRenderable(pygame.surface.Surface((8, 8))) for _ in range(3)]
+    (near, neighbour, far) = renderables
+    neighbour.position.shift(40, 0)
+    far.position.shift(500, 500)
+    for dr in renderables:
+        static.add_renderable(dr)
+    render_layer(static)
+    assert set(static.chunks) == {(0, 0), (1, 0), (15, 15)}
+
+    visited = []
+    chunk_range = static.chunk_range
+    static.chunk_range = lambda bounds: visited.append(tuple(bounds)) or chunk_range(bounds)
+
+    # Rebaking chunk (0, 0) leaves the renderable in distant chunk (15, 15) alone
+    near.position.shift(4, 4)
+    static.update_renderable(near)
+    render_layer(static)
+    assert tuple(static.bounds[id(far)]) not in visited
+    assert tuple(static.bounds[id(near)]) in visited
@@ -0,0 +1,21 @@
+from typing import NamedTuple
+
+
+class Transform(NamedTuple):
+    """
+    Transform describes how a renderable's surface is drawn: mirrored, then scaled, then rotated about its center
+
+    angle is in degrees, counterclockwise as with pygame.transform.rotate
+    """
+
+    angle: float = 0.0
+    scale: float = 1.0
+    flip_x: bool = False
+    flip_y: bool = False
+
+    @property
+    def is_identity(self) -> bool:
+        """
+        Returns true if the transform leaves a surface unchanged
+        """
+        return self.angle % 360 == 0 and self.scale == 1 and not self.flip_x and not self.flip_y
@@ -0,0 +1,14 @@
+from typing import NamedTuple
+
+
+class Trim(NamedTuple):
+    """
+    Trim records how a frame was cropped down to its opaque bounding box
+
+    x, y is the offset of the cropped surface within the untrimmed frame; width, height is the untrimmed size
+    """
+
+    x: int
+    y: int
+    width: int
+    height: int
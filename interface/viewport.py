@@ -1,22 +1,66 @@
+import math
 import pygame
 
 from interface import Position
 from interface.renderable import Renderable
 
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Set, Tuple
 
 
 class Layer:
     """
     Layer represents an individual layer of renderables
+
+    Layers can optionally keep a uniform spatial grid of their renderables' bounds, so only renderables in cells
+    overlapping the visible area are visited when blitting. The grid does not observe positions: renderables on a
+    gridded layer must be moved with move_renderable, or re-indexed with update_renderable after every other change
+    to their position (or surface size). Until then they are drawn only where the grid last placed them, and may
+    vanish from view entirely.
+
+    Static layers (i.e. backgrounds and decorations) bake their renderables into chunk surfaces, and only blit the
+    chunks overlapping the visible area. Chunks are rebaked when renderables are added, removed or updated with
+    update_renderable; changes to a renderable's surface are not picked up until then.
     """
 
-    def __init__(self, motion_scale: Tuple[float, float] = (1, 1)):
+    DEFAULT_CHUNK_SIZE: int = 512
+
+    def __init__(
+        self,
+        motion_scale: Tuple[float, float] = (1, 1),
+        cell_size: int = None,
+        static: bool = False,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ):
+        """
+        :param motion_scale: Scales the motion of the camera
+        :param cell_size: Size of the spatial grid's (square) cells, or None to visit every renderable when blitting
+            (static layers always keep a grid, of chunk sized cells by default)
+        :param static: Bake the layer's renderables into chunk surfaces rather than blitting each of them
+        :param chunk_size: Size of the (square) baked chunks of a static layer
+        """
         # Scales the motion of the camera (useful for parallax or static items (scale = 0))
         self.motion_scale: Tuple[float, float] = motion_scale
         # Dictionary of renderables organized by id (dictionaries maintain their order in Python 3.6)
         self.renderables: Dict[int, Renderable] = {}
 
+        # Static layers use the grid to find the renderables overlapping the chunks they rebake
+        self.cell_size: int = cell_size or (chunk_size if static else None)
+        # Spatial grid: cell -> renderable ids in that cell, and renderable id -> the cells it occupies
+        self.grid: Dict[Tuple[int, int], Set[int]] = {}
+        self.cells: Dict[int, List[Tuple[int, int]]] = {}
+        # Insertion sequence of each renderable, so grid queries keep the draw order
+        self.order: Dict[int, int] = {}
+        self.sequence: int = 0
+        # (surface, position) pairs drawn in the last frame, reused between frames
+        self.draw_list: List[Tuple] = []
+
+        self.static: bool = static
+        self.chunk_size: int = chunk_size
+        # Baked chunks of a static layer, the chunks needing a rebake and each renderable's bounds
+        self.chunks: Dict[Tuple[int, int], pygame.Surface] = {}
+        self.dirty_chunks: Set[Tuple[int, int]] = set()
+        self.bounds: Dict[int, pygame.Rect] = {}
+
     def add_renderable(self, renderable: Renderable) -> None:
         """
         Adds a renderable to this layer
@@ -24,6 +68,15 @@ class Layer:
         renderable_id = id(renderable)
         self.renderables[renderable_id] = renderable
 
+        if renderable_id not in self.order:
+            self.order[renderable_id] = self.sequence
+            self.sequence = self.sequence + 1
+
+        if self.cell_size:
+            self.index_renderable(renderable_id, renderable)
+        if self.static:
+            self.invalidate_chunks(renderable_id, renderable)
+
     def remove_renderable(self, renderable: Renderable) -> None:
         """
         Removes a renderable from this layer
@@ -31,31 +84,260 @@ class Layer:
         renderable_id = id(renderable)
         if renderable_id in self.renderables:
             del self.renderables[renderable_id]
+            del self.order[renderable_id]
+            self.unindex_renderable(renderable_id)
+            if self.static:
+                self.invalidate_chunks(renderable_id, None)
+
+    def move_renderable(self, renderable: Renderable, x: float = 0, y: float = 0) -> None:
+        """
+        Shifts a renderable's position by a specified amount in x, y, keeping the spatial grid and chunks up to date
+        """
+        renderable.position.shift(x, y)
+        self.update_renderable(renderable)
+
+    def update_renderable(self, renderable: Renderable) -> None:
+        """
+        Re-indexes a renderable in the spatial grid (and rebakes its chunks on a static layer) after it has moved
+
+        Must be called after any change to the position or surface size of a renderable on a gridded or static layer
+        which was not made with move_renderable
+        """
+        renderable_id = id(renderable)
+        if renderable_id not in self.renderables:
+            return
+
+        if self.cell_size:
+            self.index_renderable(renderable_id, renderable)
+        if self.static:
+            self.invalidate_chunks(renderable_id, renderable)
+
+    def cell_range(
+        self, left: float, top: float, right: float, bottom: float, cell_size: int = None
+    ) -> List[Tuple[int, int]]:
+        """
+        Returns the grid cells overlapping a rect, given by its edges
+
+        :param cell_size: The size of the cells, defaults to the spatial grid's
+        """
+        cell_size = cell_size or self.cell_size
+        (first_column, last_column) = (int(left // cell_size), int((right - 1) // cell_size))
+        (first_row, last_row) = (int(top // cell_size), int((bottom - 1) // cell_size))
+
+        return [
+            (column, row) for column in range(first_column, last_column + 1) for row in range(first_row, last_row + 1)
+        ]
+
+    def index_renderable(self, renderable_id: int, renderable: Renderable) -> None:
+        """
+        Places a renderable in every grid cell its bounds overlap
+        """
+        self.unindex_renderable(renderable_id)
+
+        (left, top) = renderable.anchored_coordinates
+        (width, height) = renderable.surface.get_size()
+        cells = self.cell_range(left, top, left + max(width, 1), top + max(height, 1))
+
+        for cell in cells:
+            self.grid.setdefault(cell, set()).add(renderable_id)
+        self.cells[renderable_id] = cells
+
+    def unindex_renderable(self, renderable_id: int) -> None:
+        """
+        Removes a renderable from the grid cells it occupies
+        """
+        for cell in self.cells.pop(renderable_id, []):
+            ids = self.grid[cell]
+            ids.discard(renderable_id)
+            if not ids:
+                del self.grid[cell]
+
+    def visible_renderables(self, viewport_position: Position, surface: pygame.Surface) -> List[Renderable]:
+        """
+        Returns the renderables which may be visible on the surface, in draw order
+
+        Without a spatial grid, that is every renderable
+        """
+        if not self.cell_size:
+            return list(self.renderables.values())
+
+        # The visible rect, in the coordinates of the renderables' anchored positions
+        left = viewport_position.x * self.motion_scale[0]
+        top = viewport_position.y * self.motion_scale[1]
+        cells = self.cell_range(left, top, left + surface.get_width(), top + surface.get_height())
+
+        return [self.renderables[renderable_id] for renderable_id in self.grid_renderable_ids(cells)]
+
+    def grid_renderable_ids(self, cells: Iterable[Tuple[int, int]]) -> List[int]:
+        """
+        Returns the ids of the renderables in any of the given grid cells, in draw order
+        """
+        ids = set()
+        for cell in cells:
+            ids.update(self.grid.get(cell, ()))
+
+        return sorted(ids, key=self.order.__getitem__)
+
+    @staticmethod
+    def renderable_bounds(renderable: Renderable) -> pygame.Rect:
+        """
+        Returns the rect covering every pixel a renderable is baked to, in anchored position coordinates
+        """
+        (x, y) = renderable.anchored_coordinates
+        # Positions are snapped down to whole pixels when baked
+        return pygame.Rect((math.floor(x), math.floor(y)), renderable.surface.get_size())
+
+    def chunk_range(self, bounds: pygame.Rect) -> List[Tuple[int, int]]:
+        """
+        Returns the chunks of a static layer overlapping a rect
+        """
+        return self.cell_range(bounds.left, bounds.top, bounds.right, bounds.bottom, self.chunk_size)
+
+    def invalidate_chunks(self, renderable_id: int, renderable: Renderable) -> None:
+        """
+        Marks the chunks a renderable covered, and now covers, for rebaking
+
+        :param renderable: The renderable, or None if it was removed
+        """
+        previous = self.bounds.pop(renderable_id, None)
+        if previous is not None:
+            self.dirty_chunks.update(self.chunk_range(previous))
+
+        if renderable is not None:
+            bounds = Layer.renderable_bounds(renderable)
+            self.bounds[renderable_id] = bounds
+            self.dirty_chunks.update(self.chunk_range(bounds))
+
+    def bake_chunks(self) -> None:
+        """
+        Rebakes every stale chunk, drawing the renderables overlapping it (in draw order) onto a new chunk surface
+
+        Chunks hold premultiplied alpha, so they composite exactly like the renderables they were baked from and
+        must be blitted with BLEND_PREMULTIPLIED. Chunks nothing overlaps are dropped. Only the renderables the
+        spatial grid places near a stale chunk are visited.
+        """
+        baked: Dict[Tuple[int, int], pygame.Surface] = {}
+
+        cells = set()
+        for (column, row) in self.dirty_chunks:
+            (left, top) = (column * self.chunk_size, row * self.chunk_size)
+            cells.update(self.cell_range(left, top, left + self.chunk_size, top + self.chunk_size))
+
+        for renderable_id in self.grid_renderable_ids(cells):
+            renderable = self.renderables[renderable_id]
+            chunks = [chunk for chunk in self.chunk_range(self.bounds[renderable_id]) if chunk in self.dirty_chunks]
+            if not chunks:
+                continue
+
+            renderable_surface = renderable.surface
+            flags = 0
+            if renderable_surface.get_flags() & pygame.SRCALPHA:
+                (renderable_surface, flags) = (renderable_surface.premul_alpha(), pygame.BLEND_PREMULTIPLIED)
+
+            # Baked on whole pixels, so the chunks can be placed from the whole pixel origin without rounding twice
+            (x, y) = renderable.anchored_coordinates
+            (x, y) = (math.floor(x), math.floor(y))
+            for chunk in chunks:
+                if chunk not in baked:
+                    baked[chunk] = pygame.Surface((self.chunk_size, self.chunk_size), pygame.SRCALPHA, 32)
+                position = (x - chunk[0] * self.chunk_size, y - chunk[1] * self.chunk_size)
+                baked[chunk].blit(renderable_surface, position, special_flags=flags)
+
+        for chunk in self.dirty_chunks:
+            if chunk in baked:
+                self.chunks[chunk] = baked[chunk]
+            else:
+                self.chunks.pop(chunk, None)
+        self.dirty_chunks.clear()
+
+    def build_chunk_draw_list(self, viewport_position: Position, surface: pygame.Surface) -> List[Tuple]:
+        """
+        Fills this static layer's draw list with the baked chunks overlapping the surface, rebaking stale chunks
+        """
+        if self.dirty_chunks:
+            self.bake_chunks()
+
+        (left, top) = self.chunk_origin(viewport_position)
+        visible = self.cell_range(left, top, left + surface.get_width(), top + surface.get_height(), self.chunk_size)
+
+        draw_list = self.draw_list
+        del draw_list[:]
+        for chunk in visible:
+            baked = self.chunks.get(chunk)
+            if baked is not None:
+                position = (chunk[0] * self.chunk_size - left, chunk[1] * self.chunk_size - top)
+                draw_list.append((baked, position, None, pygame.BLEND_PREMULTIPLIED))
+
+        return draw_list
+
+    def chunk_origin(self, viewport_position: Position) -> Tuple[int, int]:
+        """
+        Returns the point of this static layer drawn at the top left of the screen, based upon viewport position and
+        layer scaling, snapped down to a whole pixel
+
+        Baked renderables are snapped down to whole pixels too, so with fractional positions a static layer may draw a
+        renderable one pixel from where an ordinary layer (see get_renderable_position) would
+        """
+        return (
+            math.floor(viewport_position.x * self.motion_scale[0]),
+            math.floor(viewport_position.y * self.motion_scale[1]),
+        )
 
     def get_renderable_position(self, viewport_position: Position, renderable: Renderable) -> Tuple[float, float]:
         """
         Calculates a renderable's position on the screen based upon viewport position and layer scaling
         """
-        anchored_position = renderable.anchored_position
+        (x, y) = renderable.anchored_coordinates
 
         return (
-            anchored_position.x - (viewport_position.x * self.motion_scale[0]),
-            anchored_position.y - (viewport_position.y * self.motion_scale[1]),
+            x - (viewport_position.x * self.motion_scale[0]),
+            y - (viewport_position.y * self.motion_scale[1]),
         )
 
-    def blit(self, viewport_position: Position, surface: pygame.Surface) -> None:
+    def build_draw_list(
+        self, viewport_position: Position, surface: pygame.Surface
+    ) -> List[Tuple[pygame.Surface, Tuple[float, float]]]:
         """
-        Renders this layer's renderables onto the given surface
+        Fills this layer's draw list with a (surface, position) pair for every renderable visible on the surface
+
+        The draw list is reused between frames, so it is only valid until the next call
         """
-        for renderable in self.renderables.values():
+        if self.static:
+            return self.build_chunk_draw_list(viewport_position, surface)
+
+        draw_list = self.draw_list
+        (surface_width, surface_height) = (surface.get_width(), surface.get_height())
+        count = 0
+
+        for renderable in self.visible_renderables(viewport_position, surface):
             rendering_position = self.get_renderable_position(viewport_position, renderable)
+            renderable_surface = renderable.surface
 
-            # Since this rendering position would mark the top left of the renderable, we can do a quick
-            # check to see if the rendering position > surface width/height
-            if rendering_position[0] > surface.get_width() or rendering_position[1] > surface.get_height():
+            # Skip renderables whose rect lies entirely off the surface
+            if (
+                rendering_position[0] >= surface_width
+                or rendering_position[1] >= surface_height
+                or rendering_position[0] + renderable_surface.get_width() <= 0
+                or rendering_position[1] + renderable_surface.get_height() <= 0
+            ):
                 continue
 
-            surface.blit(renderable.surface, rendering_position)
+            if count < len(draw_list):
+                draw_list[count] = (renderable_surface, rendering_position)
+            else:
+                draw_list.append((renderable_surface, rendering_position))
+            count = count + 1
+
+        del draw_list[count:]
+        return draw_list
+
+    def blit(self, viewport_position: Position, surface: pygame.Surface) -> None:
+        """
+        Renders this layer's renderables onto the given surface, submitting them in one batch
+        """
+        draw_list = self.build_draw_list(viewport_position, surface)
+        if draw_list:
+            surface.blits(draw_list, doreturn=False)
 
 
 class Viewport:
@@ -69,11 +351,19 @@ class Viewport:
     Priority is such that 0 is rendered on top of 1, and so on
     """
 
+    # In dirty rect mode, redraw everything once the changed area exceeds this fraction of the surface
+    DIRTY_AREA_LIMIT: float = 0.5
+
     def __init__(self):
         self.position: Position = Position()
         self.layers: Dict[int, Layer] = {}
         self.ordered_priorities: List[int] = []
 
+        # Dirty rect mode state: what was drawn last frame, from where, and whether everything must be redrawn
+        self.previous_draws: Set[Tuple[pygame.Surface, int, int, int, int]] = set()
+        self.previous_position: Tuple[float, float] = None
+        self.full_redraw: bool = True
+
     def add_layer(self, priority: int, layer: Layer) -> bool:
         """
         Adds a layer to this viewport, returns true if the layer was successfully added
@@ -81,6 +371,7 @@ class Viewport:
         if priority not in self.layers:
             self.layers[priority] = layer
             self.__update_priorities()
+            self.invalidate()
             return True
 
         return False
@@ -89,6 +380,7 @@ class Viewport:
         """
         Removes a layer either by priority or by layer
         """
+        self.invalidate()
         if priority and priority in self.layers:
             del self.layers[priority]
         elif layer:
@@ -113,3 +405,84 @@ class Viewport:
         """
         for priority in self.ordered_priorities:
             self.layers[priority].blit(self.position, surface)
+
+    def invalidate(self) -> None:
+        """
+        Forces the next dirty rect frame to redraw everything, i.e. after a surface was modified in place
+        """
+        self.full_redraw = True
+
+    def blit_dirty(self, surface: pygame.Surface, background: int = 0) -> List[pygame.Rect]:
+        """
+        Draws all layers on screen, only clearing and redrawing the regions which changed since the last call
+
+        A region changes when a renderable appears, disappears, moves or changes surface (i.e. animates). Everything
+        is redrawn when the viewport moves, layers are added or removed, or invalidate was called.
+
+        Returns the rects of the surface which were redrawn, for pygame.display.update
+
+        :param surface: The surface to draw on; it must keep its contents between calls
+        :param background: The color regions are cleared to before redrawing
+        """
+        surface_rect = surface.get_rect()
+        layers = []
+        draws = set()
+        for priority in self.ordered_priorities:
+            draw_list = self.layers[priority].build_draw_list(self.position, surface)
+            rects = []
+            for entry in draw_list:
+                (renderable_surface, (x, y)) = (entry[0], entry[1])
+                # pygame truncates fractional blit positions toward zero, so this is exactly the rect drawn to
+                rect = pygame.Rect((int(x), int(y)), renderable_surface.get_size())
+                rects.append(rect)
+                draws.add((renderable_surface, rect.x, rect.y, rect.width, rect.height))
+            layers.append((draw_list, rects))
+
+        position = (self.position.x, self.position.y)
+        full_redraw = self.full_redraw or position != self.previous_position
+        changed = draws ^ self.previous_draws
+        (self.previous_draws, self.previous_position, self.full_redraw) = (draws, position, False)
+
+        dirty_rects = []
+        if not full_redraw:
+            dirty_rects = Viewport.merge_rects(
+                [surface_rect.clip(x, y, width, height) for (_, x, y, width, height) in changed]
+            )
+            dirty_area = sum(rect.width * rect.height for rect in dirty_rects)
+            full_redraw = dirty_area > surface_rect.width * surface_rect.height * Viewport.DIRTY_AREA_LIMIT
+
+        if full_redraw:
+            surface.fill(background)
+            for (draw_list, _) in layers:
+                if draw_list:
+                    surface.blits(draw_list, doreturn=False)
+            return [surface_rect]
+
+        for dirty_rect in dirty_rects:
+            surface.set_clip(dirty_rect)
+            surface.fill(background, dirty_rect)
+            for (draw_list, rects) in layers:
+                overlapping = dirty_rect.collidelistall(rects)
+                if overlapping:
+                    surface.blits([draw_list[index] for index in overlapping], doreturn=False)
+        surface.set_clip(None)
+
+        return dirty_rects
+
+    @staticmethod
+    def merge_rects(rects: List[pygame.Rect]) -> List[pygame.Rect]:
+        """
+        Merges overlapping rects into their unions, dropping empty rects
+        """
+        merged: List[pygame.Rect] = []
+        for rect in rects:
+            if not rect.width or not rect.height:
+                continue
+
+            index = rect.collidelist(merged)
+            while index != -1:
+                rect = rect.union(merged.pop(index))
+                index = rect.collidelist(merged)
+            merged.append(rect)
+
+        return merged
@@ -4,14 +4,16 @@ import sys
 
 from settings.config import APP_DATA
 from interface import Viewport
-from events import Event, Orchestrator, ChronoOrchestrator
+from events import Event, Orchestrator, ChronoOrchestrator, AnimationScheduler
 from threading import Thread
 
 
 class Window:
-    def __init__(self, title: str, width: int = 1000, height: int = 1000):
+    def __init__(self, title: str, width: int = 1000, height: int = 1000, dirty_rects: bool = False):
         """
         Initializes a window
+
+        :param dirty_rects: Only redraw and update the regions of the screen which changed each frame
         """
         self.logger = logging.getLogger(__name__)
 
@@ -23,6 +25,7 @@ class Window:
         pygame.init()
 
         self.viewport: Viewport = None
+        self.dirty_rects: bool = dirty_rects
 
         # Create screen
         self.logger.debug(f"Creating screen with dimensions: {width} x {height}")
@@ -31,6 +34,7 @@ class Window:
 
         self.orchestrator: Orchestrator = Orchestrator.get_instance()
         self.chronoorchestrator: ChronoOrchestrator = ChronoOrchestrator.get_instance()
+        self.animationscheduler: AnimationScheduler = AnimationScheduler.get_instance()
         self.render_clock: pygame.time.Clock = pygame.time.Clock()
         self.logic_clock: pygame.time.Clock = pygame.time.Clock()
 
@@ -56,6 +60,7 @@ class Window:
         """
         Sets the viewport
         """
+        viewport.invalidate()
         self.viewport = viewport
 
     def run_rendering(self) -> None:
@@ -63,14 +68,21 @@ class Window:
         Runs the window, rendering to screen
         """
         while not self.exit_signal:
-            # Blank out the screen
-            self.screen.fill(0)
+            if self.dirty_rects and self.viewport:
+                # Only the regions which changed are redrawn and pushed to the display
+                rects = self.viewport.blit_dirty(self.screen)
+                if rects:
+                    pygame.display.update(rects)
+            else:
+                # Blank out the screen
+                self.screen.fill(0)
+
+                # Render everything our viewport has
+                if self.viewport:
+                    self.viewport.blit(self.screen)
 
-            # Render everything our viewport has
-            if self.viewport:
-                self.viewport.blit(self.screen)
+                pygame.display.flip()
 
-            pygame.display.flip()
             self.render_clock.tick(APP_DATA.get("clocks", {}).get("rendering", 60))  # Max out at 60 FPS
 
     def run_logic(self) -> None:
@@ -88,4 +100,5 @@ class Window:
             # Broadcast all currently held down keys
             self.orchestrator.emit(Event.KEYS_PRESSED, pygame.key.get_pressed())
             self.chronoorchestrator.update()
+            self.animationscheduler.update()
             self.logic_clock.tick(APP_DATA.get("clocks", {}).get("logic", 100))
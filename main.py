@@ -4,6 +4,7 @@ import logging
 import logging.config
 
 from devdemos import DEV_DEMOS
+from imaging import Spritesheet
 from settings import config
 
 """
@@ -23,6 +24,16 @@ def main():
     parser.add_argument("-ll", "--log-level", help="Set the default log level")
     parser.add_argument("-le", "--log-events", action="store_true", help="Log events")
     parser.add_argument("-dd", "--dev-demo", help="Run the specified dev demo", choices=DEV_DEMOS.keys())
+    parser.add_argument(
+        "-gm", "--generate-manifests", help="Generate slice manifests for the spritesheets in a directory"
+    )
+    parser.add_argument(
+        "-bc",
+        "--break-coefficient",
+        help="Break coefficient used when generating slice manifests",
+        type=int,
+        default=Spritesheet.BREAK_COEFFICIENT_TRANSPARENT,
+    )
 
     args = parser.parse_args()
 
@@ -48,6 +59,12 @@ def main():
         logger.info(f"Setting log events to {args.log_events}")
         config.SETTINGS["logging"]["events"] = True
 
+    if args.generate_manifests:
+        logger.info(f"Generating slice manifests for {args.generate_manifests}")
+        sliced = Spritesheet.generate_manifests(args.generate_manifests, args.break_coefficient)
+        logger.info(f"Generated {sliced} slice manifests")
+        sys.exit(0)
+
     if args.dev_demo:
         logger.info(f"Dev demo option {args.dev_demo} selected")
         demo = DEV_DEMOS.get(args.dev_demo, False)